@@ -0,0 +1,244 @@
+"""Local stand-in for the csnetmanager.com endpoints used by CSnetHub.
+
+Serves GET/POST /login, GET /data/elements and POST /data/indoor/heat_setting
+with the same cookies and redirects as the real service, and can add
+latency, expire sessions and inject failures. Point a hub at it with
+``CSnetHub(username, password, base_url=server.url)``.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import secrets
+
+from aiohttp import web
+
+USERNAME = "bench@example.com"
+PASSWORD = "bench"
+
+
+class FakeCSnet:
+    """In-process CSNet server with configurable size, latency and faults."""
+
+    def __init__(
+        self,
+        units=1,
+        zones_per_unit=2,
+        latency=0.0,
+        session_requests=0,
+        error_rate=0.0,
+        reset_rate=0.0,
+        seed=0,
+        write_latency=0.0,
+    ) -> None:
+        """Initialize the server.
+
+        `session_requests` expires a session after that many data requests
+        (0 keeps sessions forever); `error_rate` and `reset_rate` are the
+        share of data requests answered with a 503 or a dropped connection.
+        A heat_setting write is in flight for `write_latency` seconds; writes
+        to a unit that overlap another one are counted in `overlapping_writes`.
+        """
+        if not 1 <= zones_per_unit <= 2:
+            raise ValueError("CSNet indoor units have one or two air circuits")
+        self.latency = latency
+        self.session_requests = session_requests
+        self.error_rate = error_rate
+        self.reset_rate = reset_rate
+        self._random = random.Random(seed)
+        self._sessions = {}
+        self.elements = build_elements(units, zones_per_unit)
+        self.available = True
+        self.logins = 0
+        self.failed_logins = 0
+        self.requests = {}
+        self.writes = []
+        self.write_latency = write_latency
+        self.overlapping_writes = 0
+        self._writing = set()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._runner = None
+        self.url = ""
+
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get("/login", self._login_page)
+        app.router.add_post("/login", self._login)
+        app.router.add_get("/data/elements", self._elements)
+        app.router.add_post("/data/indoor/heat_setting", self._heat_setting)
+        self.app = app
+
+    async def start(self, host="localhost", port=0):
+        """Start serving; cookies need a host name, not an IP address."""
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.url = f"http://{host}:{site._server.sockets[0].getsockname()[1]}"
+        return self.url
+
+    async def stop(self):
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def reset_stats(self):
+        """Forget the counters collected so far."""
+        self.logins = 0
+        self.failed_logins = 0
+        self.requests = {}
+        self.writes = []
+        self.overlapping_writes = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    @property
+    def request_count(self):
+        """Return the number of requests served."""
+        return sum(self.requests.values())
+
+    def expire_sessions(self):
+        """Invalidate every session, as a server-side logout would."""
+        self._sessions.clear()
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        name = f"{request.method} {request.path}"
+        self.requests[name] = self.requests.get(name, 0) + 1
+        self.bytes_in += request.content_length or 0
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if not self.available:
+            request.transport.close()
+            raise web.HTTPServiceUnavailable()
+        response = await handler(request)
+        if response.body is not None:
+            self.bytes_out += len(response.body)
+        return response
+
+    def _session(self, request):
+        """Return the session id of an authenticated request, or None."""
+        session = request.cookies.get("SESSION")
+        if session not in self._sessions:
+            return None
+        self._sessions[session] += 1
+        if self.session_requests and self._sessions[session] > self.session_requests:
+            del self._sessions[session]
+            return None
+        return session
+
+    def _fault(self, request):
+        """Return an injected failure response, or None."""
+        roll = self._random.random()
+        if roll < self.reset_rate:
+            request.transport.close()
+            return web.Response(status=500)
+        if roll < self.reset_rate + self.error_rate:
+            return web.Response(status=503, text="<html>Service Unavailable</html>", content_type="text/html")
+        return None
+
+    async def _login_page(self, request):
+        response = web.Response(text="<html>login</html>", content_type="text/html")
+        response.set_cookie("XSRF-TOKEN", secrets.token_hex(16))
+        response.set_cookie("AWSALBTG", secrets.token_hex(8))
+        return response
+
+    async def _login(self, request):
+        form = await request.post()
+        if form.get("username") != USERNAME or form.get("password") != PASSWORD:
+            self.failed_logins += 1
+            raise web.HTTPFound("/login?error")
+        if form.get("_csrf") != request.cookies.get("XSRF-TOKEN"):
+            raise web.HTTPForbidden()
+        self.logins += 1
+        session = secrets.token_hex(16)
+        self._sessions[session] = 0
+        response = web.HTTPFound("/")
+        response.set_cookie("SESSION", session)
+        raise response
+
+    async def _elements(self, request):
+        if (fault := self._fault(request)) is not None:
+            return fault
+        if self._session(request) is None:
+            raise web.HTTPFound("/login")
+        body = {
+            "status": "success",
+            "data": {
+                "elements": self.elements,
+                "avOuTemp": 7,
+                "weatherTemperature": 6.5,
+                "installationName": "Bench",
+            },
+        }
+        return web.Response(body=json.dumps(body).encode(), content_type="application/json")
+
+    async def _heat_setting(self, request):
+        if (fault := self._fault(request)) is not None:
+            return fault
+        if self._session(request) is None:
+            raise web.HTTPFound("/login")
+        form = dict(await request.post())
+        unit = form["indoorId"]
+        if unit in self._writing:
+            self.overlapping_writes += 1
+        self._writing.add(unit)
+        try:
+            if self.write_latency:
+                await asyncio.sleep(self.write_latency)
+            self.writes.append(form)
+            self._apply(form)
+        finally:
+            self._writing.discard(unit)
+        return web.json_response({"status": "success"})
+
+    def _apply(self, form):
+        """Reflect a write in the served elements, as the heat pump would."""
+        parent = int(form["indoorId"])
+        for element in self.elements:
+            if element["parentId"] != parent:
+                continue
+            kind = element["elementType"]
+            if kind == 3:
+                if "runStopDHW" in form:
+                    element["onOff"] = int(form["runStopDHW"])
+                if "settingTempDHW" in form:
+                    element["settingTemperature"] = int(form["settingTempDHW"])
+            else:
+                if f"runStopC{kind}Air" in form:
+                    element["onOff"] = int(form[f"runStopC{kind}Air"])
+                if f"settingTempRoomZ{kind}" in form:
+                    element["settingTemperature"] = int(form[f"settingTempRoomZ{kind}"]) / 10
+
+
+def build_elements(units, zones_per_unit):
+    """Return the elements of `units` indoor units with air zones and a tank."""
+    elements = []
+    for unit in range(units):
+        parent = 1000 + unit
+        for kind in [*range(1, zones_per_unit + 1), 3]:
+            water = kind == 3
+            elements.append(
+                {
+                    "elementType": kind,
+                    "parentId": parent,
+                    "roomId": parent * 10 + kind,
+                    "name": "Hot Water" if water else f"Zone {kind}",
+                    "currentTemperature": 45.0 if water else 20.5,
+                    "settingTemperature": 50 if water else 21.0,
+                    "onOff": 1,
+                    "mode": 1,
+                    "realMode": 1,
+                    "ecocomfort": 1,
+                    "alarmCode": 0,
+                    "doingBoost": False,
+                    "timerRunning": False,
+                    "silentMode": 0,
+                    "operationStatus": 6,
+                    "tempSetMin": 30 if water else 5,
+                    "tempSetMax": 60 if water else 35,
+                }
+            )
+    return elements
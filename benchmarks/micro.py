@@ -0,0 +1,291 @@
+"""CPU micro-benchmarks of the per-poll hot paths at synthetic scale.
+
+Times, without any network, what runs on every poll for generated
+payloads of 1 to 500 elements:
+
+- ``parse``: ``CSnetHub.update()`` decoding the elements response into an
+  ElementIndex, for units with two air circuits and a tank unless
+  ``--zones 1`` is given
+- ``map``: ``CSnetCoordinator._async_update_data()`` on an already parsed
+  index (order matching, interval adaptation and the change diff)
+- ``entities``: ``_handle_coordinator_update()`` of every climate and water
+  heater entity
+- ``poll``: a whole ``async_refresh()``, including the listener dispatch to
+  those entities
+
+Consecutive polls alternate between two payloads whose readings differ, so
+every element changes and every entity updates. State writes are counted
+instead of going through Home Assistant's state machine.
+
+Run from the repository root:
+
+    python -m benchmarks.micro --save baseline.json
+    python -m benchmarks.micro --baseline baseline.json --threshold 0.25
+
+For every stage and size the result holds the time per call, the time per
+element and the peak memory allocated by one call (tracemalloc). The run
+exits with status 1 when a stage is slower than the baseline by more than
+``--threshold``, or when its time grows faster with the element count than
+``--max-scaling`` allows (1.0 is linear).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.csnet import climate, water_heater
+from custom_components.csnet.const import DOMAIN
+from custom_components.csnet.coordinator import CSnetCoordinator
+from custom_components.csnet.hub import CSnetHub
+
+from .fake_csnet import build_elements
+
+SIZES = (1, 10, 50, 100, 250, 500)
+STAGES = ("parse", "map", "entities", "poll")
+# Stages faster than this many milliseconds are too noisy to gate on
+NOISE_FLOOR_MS = 0.02
+
+
+def payloads(size, zones=2):
+    """Return two encoded elements responses of `size` elements with different readings.
+
+    Every indoor unit has `zones` air circuits and a hot water tank.
+    """
+    bodies = []
+    for shift in (0.0, 0.5):
+        elements = build_elements(math.ceil(size / (zones + 1)), zones)[:size]
+        for element in elements:
+            element["currentTemperature"] += shift
+        body = {
+            "status": "success",
+            "data": {"elements": elements, "avOuTemp": 7, "weatherTemperature": 6.5 + shift},
+        }
+        bodies.append(json.dumps(body).encode())
+    return bodies
+
+
+class StaticHub(CSnetHub):
+    """Hub answering every request with the next of the given responses."""
+
+    def __init__(self, bodies) -> None:
+        """Initialize the hub without a session."""
+        super().__init__("bench", "bench")
+        self._bodies = bodies
+        self._served = 0
+
+    async def _request(self, method, path, data=None, headers=None, expect_json=True):
+        self._served += 1
+        return 200, self._bodies[self._served % len(self._bodies)]
+
+
+class ParsedHub(CSnetHub):
+    """Hub answering update() with the next of the given parsed indexes."""
+
+    def __init__(self, indexes, installations) -> None:
+        """Initialize the hub without a session."""
+        super().__init__("bench", "bench")
+        self._indexes = indexes
+        self._installations = installations
+        self._served = 0
+
+    async def update(self):
+        self._served += 1
+        self.last_full_data = self._installations[self._served % len(self._indexes)]
+        return self._indexes[self._served % len(self._indexes)]
+
+
+# The part of a config entry the platforms read
+ENTRY = SimpleNamespace(entry_id="bench")
+
+
+async def _entities(hass, coordinator):
+    """Create the climate and water heater entities, counting their state writes."""
+    hass.data[DOMAIN] = {ENTRY.entry_id: coordinator}
+    entities = []
+    for platform in (climate, water_heater):
+        await platform.async_setup_entry(hass, ENTRY, entities.extend)
+    writes = [0]
+
+    def count_write():
+        writes[0] += 1
+
+    for entity in entities:
+        entity.async_write_ha_state = count_write
+    return entities, writes
+
+
+def _loops(size):
+    """Return how many calls one timed round makes, fewer for larger payloads."""
+    return max(10, 2000 // size)
+
+
+async def measure(call, size, rounds):
+    """Return the median time per call in seconds and the peak bytes of one call."""
+    loops = _loops(size)
+    await call()  # warm up caches and lazy imports
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(loops):
+            await call()
+        timings.append((time.perf_counter() - start) / loops)
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        await call()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+async def run_size(hass, size, rounds, zones):
+    """Benchmark every stage for one payload size."""
+    bodies = payloads(size, zones)
+    results = {}
+
+    # parse: decode the response as the hub does on every poll
+    hub = StaticHub(bodies)
+
+    async def parse():
+        hub.invalidate_elements()
+        await hub.update()
+
+    results["parse"] = await measure(parse, size, rounds)
+
+    # Parsed indexes for the stages that start after the fetch
+    indexes, installations = [], []
+    for _ in bodies:
+        hub.invalidate_elements()
+        indexes.append(await hub.update())
+        installations.append(hub.last_full_data)
+    await hub.close()
+
+    coordinator = CSnetCoordinator(hass, ParsedHub(indexes, installations))
+    await coordinator.async_refresh()
+
+    async def map_elements():
+        coordinator.data = await coordinator._async_update_data()
+
+    results["map"] = await measure(map_elements, size, rounds)
+
+    entities, writes = await _entities(hass, coordinator)
+    served = [0]
+
+    async def update_entities():
+        served[0] += 1
+        coordinator.data = indexes[served[0] % len(indexes)].elements
+        for entity in entities:
+            entity._handle_coordinator_update()
+
+    results["entities"] = await measure(update_entities, size, rounds)
+
+    # poll: the full refresh with the entities listening for their elements
+    coordinator = CSnetCoordinator(hass, StaticHub(bodies))
+    await coordinator.async_refresh()
+    entities, writes = await _entities(hass, coordinator)
+    for entity in entities:
+        coordinator.async_add_listener(entity._handle_coordinator_update, entity.coordinator_context)
+
+    async def poll():
+        coordinator.hub.invalidate_elements()
+        await coordinator.async_refresh()
+
+    writes[0] = 0
+    results["poll"] = await measure(poll, size, rounds)
+    if not writes[0]:
+        raise RuntimeError("The polls did not update any entity")
+    await coordinator.async_shutdown()
+    await coordinator.hub.close()
+
+    return {
+        stage: {
+            "ms": round(seconds * 1000, 4),
+            "us_per_element": round(seconds * 1e6 / size, 3),
+            "peak_kib": round(peak / 1024, 1),
+        }
+        for stage, (seconds, peak) in results.items()
+    }
+
+
+def scaling(result, sizes):
+    """Return the growth exponent of each stage between the two largest sizes."""
+    if len(sizes) < 2:
+        return {}
+    small, large = sizes[-2], sizes[-1]
+    return {
+        stage: round(
+            math.log(result[str(large)][stage]["ms"] / result[str(small)][stage]["ms"]) / math.log(large / small), 2
+        )
+        for stage in STAGES
+    }
+
+
+async def run(args):
+    """Benchmark every size and collect the results."""
+    hass = HomeAssistant(tempfile.mkdtemp())
+    try:
+        sizes = {str(size): await run_size(hass, size, args.rounds, args.zones) for size in args.sizes}
+    finally:
+        await hass.async_stop(force=True)
+    return {"sizes": sizes, "scaling": scaling(sizes, args.sizes)}
+
+
+def regressions(result, baseline, threshold, max_scaling):
+    """Return a line for every stage slower than the baseline or scaling too steeply."""
+    lines = []
+    for size, stages in result["sizes"].items():
+        for stage, values in stages.items():
+            reference = baseline.get("sizes", {}).get(size, {}).get(stage) if baseline else None
+            if reference is None or max(values["ms"], reference["ms"]) < NOISE_FLOOR_MS:
+                continue
+            if values["ms"] > reference["ms"] * (1 + threshold):
+                lines.append(f"{stage}@{size} {values['ms']} ms > {reference['ms']} ms + {threshold:.0%}")
+    if max_scaling is not None:
+        for stage, exponent in result["scaling"].items():
+            if exponent > max_scaling:
+                lines.append(f"{stage} scales with exponent {exponent} > {max_scaling}")
+    return lines
+
+
+def main(argv=None):
+    """Parse the arguments, run the benchmarks and compare them with the baseline."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="elements per payload")
+    parser.add_argument("--zones", type=int, choices=(1, 2), default=2, help="air circuits per indoor unit")
+    parser.add_argument("--rounds", type=int, default=5, help="timed rounds per stage and size")
+    parser.add_argument("--save", help="write the results to this file as the new baseline")
+    parser.add_argument("--baseline", help="results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown against the baseline")
+    parser.add_argument("--max-scaling", type=float, help="allowed growth exponent between the two largest sizes")
+    args = parser.parse_args(argv)
+    args.sizes = sorted(args.sizes)
+
+    result = asyncio.run(run(args))
+    print(json.dumps(result, indent=2))
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(result, file, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+    exceeded = regressions(result, baseline, args.threshold, args.max_scaling)
+    for line in exceeded:
+        print(f"REGRESSION: {line}", file=sys.stderr)
+    return 1 if exceeded else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
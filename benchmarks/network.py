@@ -0,0 +1,137 @@
+"""End-to-end network benchmark of CSnetHub and CSnetCoordinator.
+
+Runs the hub and the coordinator against the local FakeCSnet server and
+reports logins per simulated hour, requests per poll, poll and command
+latency percentiles and bytes transferred. Each poll stands for
+``--interval`` seconds of real operation, so session expiry and login counts
+scale to an hour without waiting for one.
+
+Run from the repository root:
+
+    python -m benchmarks.network --units 2 --latency 0.05 --polls 100
+
+With any of the ``--max-*`` limits set the run exits with status 1 when a
+limit is exceeded, which makes it usable as a regression gate.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.csnet.coordinator import CSnetCoordinator
+from custom_components.csnet.hub import CSnetHub
+
+from .fake_csnet import PASSWORD, USERNAME, FakeCSnet
+
+
+def percentile(values, share):
+    """Return the value below which `share` of the sorted values fall."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(share * (len(ordered) - 1)))]
+
+
+async def run(args):
+    """Drive polls and commands against the stand-in and collect the results."""
+    server = FakeCSnet(
+        units=args.units,
+        zones_per_unit=args.zones,
+        latency=args.latency,
+        session_requests=args.session_requests,
+        error_rate=args.error_rate,
+        reset_rate=args.reset_rate,
+        seed=args.seed,
+    )
+    await server.start()
+    hass = HomeAssistant(tempfile.mkdtemp())
+    hub = CSnetHub(USERNAME, PASSWORD, base_url=server.url)
+    coordinator = CSnetCoordinator(hass, hub)
+    # Logins and requests of the first poll are part of the measurement
+    server.reset_stats()
+
+    poll_latency = []
+    poll_requests = 0
+    failed_polls = 0
+    command_latency = []
+    parents = sorted({element["parentId"] for element in server.elements})
+    try:
+        for poll in range(args.polls):
+            # Polls are --interval apart in simulated time, past the cache TTL
+            hub.invalidate_elements()
+            before = server.request_count
+            start = time.perf_counter()
+            await coordinator.async_refresh()
+            poll_latency.append(time.perf_counter() - start)
+            poll_requests += server.request_count - before
+            failed_polls += not coordinator.last_update_success
+
+            if args.command_every and poll % args.command_every == 0:
+                parent = parents[poll // args.command_every % len(parents)]
+                start = time.perf_counter()
+                await hub.toggle(parent, 1, 1, 20 + poll % 5)
+                command_latency.append(time.perf_counter() - start)
+    finally:
+        await hub.close()
+        await hass.async_stop(force=True)
+        await server.stop()
+
+    hours = args.polls * args.interval / 3600
+    return {
+        "polls": args.polls,
+        "failed_polls": failed_polls,
+        "logins_per_hour": round(server.logins / hours, 2),
+        "requests_per_poll": round(poll_requests / args.polls, 3),
+        "poll_p50_ms": round(percentile(poll_latency, 0.5) * 1000, 2),
+        "poll_p99_ms": round(percentile(poll_latency, 0.99) * 1000, 2),
+        "commands": len(command_latency),
+        "command_p50_ms": round(percentile(command_latency, 0.5) * 1000, 2),
+        "command_p99_ms": round(percentile(command_latency, 0.99) * 1000, 2),
+        "bytes_in": server.bytes_in,
+        "bytes_out": server.bytes_out,
+        "bytes_per_poll": round((server.bytes_in + server.bytes_out) / args.polls),
+    }
+
+
+def main(argv=None):
+    """Parse the arguments, run the benchmark and apply the limits."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--units", type=int, default=1, help="indoor units on the account")
+    parser.add_argument("--zones", type=int, default=2, help="air circuits per unit (1 or 2)")
+    parser.add_argument("--latency", type=float, default=0.0, help="server latency per request in seconds")
+    parser.add_argument("--polls", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=30.0, help="simulated seconds per poll")
+    parser.add_argument("--command-every", type=int, default=5, help="send a command every N polls (0 disables)")
+    parser.add_argument("--session-requests", type=int, default=0, help="expire sessions after N data requests")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of data requests answered with 503")
+    parser.add_argument("--reset-rate", type=float, default=0.0, help="share of data requests with a dropped connection")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-requests-per-poll", type=float)
+    parser.add_argument("--max-logins-per-hour", type=float)
+    parser.add_argument("--max-poll-p99-ms", type=float)
+    parser.add_argument("--max-command-p99-ms", type=float)
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run(args))
+    print(json.dumps(result, indent=2))
+
+    limits = {
+        "requests_per_poll": args.max_requests_per_poll,
+        "logins_per_hour": args.max_logins_per_hour,
+        "poll_p99_ms": args.max_poll_p99_ms,
+        "command_p99_ms": args.max_command_p99_ms,
+    }
+    exceeded = [f"{key} {result[key]} > {limit}" for key, limit in limits.items() if limit is not None and result[key] > limit]
+    for line in exceeded:
+        print(f"LIMIT EXCEEDED: {line}", file=sys.stderr)
+    return 1 if exceeded else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
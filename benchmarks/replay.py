@@ -0,0 +1,167 @@
+"""Replay a CSNet wire trace through CSnetHub and CSnetCoordinator.
+
+Serves the exchanges recorded by the integration's wire recorder (the
+``csnet_wire.jsonl.gz`` file in the Home Assistant configuration directory)
+from a local server, so a user's slow or broken poll can be reproduced and
+profiled without contacting CSNet. Responses are served per method and
+path in recording order; once a path runs out its last response repeats.
+
+Run from the repository root:
+
+    python -m benchmarks.replay csnet_wire.jsonl.gz --polls 20 --profile
+
+Rotated parts are replayed in the order given, e.g. ``csnet_wire.jsonl.gz.1
+csnet_wire.jsonl.gz``.
+
+``--latency recorded`` replays the server time of every exchange as well.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import cProfile
+from collections import defaultdict, deque
+import json
+import pstats
+import secrets
+import sys
+import tempfile
+import time
+
+from aiohttp import web
+from homeassistant.core import HomeAssistant
+
+from custom_components.csnet.coordinator import CSnetCoordinator
+from custom_components.csnet.hub import CSnetHub
+from custom_components.csnet.wiretrace import read_trace
+
+# Used for the login when the trace (or its rotated part) has none
+DEFAULT_LOGIN = {
+    ("GET", "/login"): {"status": 200, "content_type": "text/html", "response": "<html>login</html>", "elapsed": 0},
+    ("POST", "/login"): {"status": 302, "location": "/", "response": "", "elapsed": 0},
+}
+
+
+class ReplayServer:
+    """Local server answering with the responses of a wire trace."""
+
+    def __init__(self, exchanges, recorded_latency=False) -> None:
+        """Initialize the server from recorded exchanges."""
+        self.recorded_latency = recorded_latency
+        self._responses = defaultdict(deque)
+        for exchange in exchanges:
+            self._responses[(exchange["method"], exchange["path"])].append(exchange)
+        self.served = defaultdict(int)
+        self._runner = None
+        self.url = ""
+        app = web.Application()
+        app.router.add_route("*", "/{path:.*}", self._handle)
+        self.app = app
+
+    async def start(self, host="localhost", port=0):
+        """Start serving; cookies need a host name, not an IP address."""
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.url = f"http://{host}:{site._server.sockets[0].getsockname()[1]}"
+        return self.url
+
+    async def stop(self):
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _next(self, key):
+        """Return the next recorded exchange for a method and path."""
+        queue = self._responses.get(key)
+        if not queue:
+            return DEFAULT_LOGIN.get(key)
+        return queue.popleft() if len(queue) > 1 else queue[0]
+
+    async def _handle(self, request):
+        key = (request.method, request.path)
+        exchange = self._next(key)
+        if exchange is None:
+            raise web.HTTPNotFound(text=f"{request.method} {request.path} is not in the trace")
+        self.served[f"{request.method} {request.path}"] += 1
+        if self.recorded_latency:
+            await asyncio.sleep(exchange["elapsed"])
+        content_type = (exchange.get("content_type") or "application/octet-stream").split(";")[0]
+        response = web.Response(
+            status=exchange["status"],
+            body=exchange["response"].encode(),
+            content_type=content_type,
+        )
+        if exchange.get("location"):
+            response.headers["Location"] = exchange["location"]
+        # Sessions are never recorded; hand out fresh cookies where CSNet would
+        if key == ("GET", "/login"):
+            response.set_cookie("XSRF-TOKEN", secrets.token_hex(16))
+        elif key == ("POST", "/login") and "error" not in (exchange.get("location") or ""):
+            response.set_cookie("SESSION", secrets.token_hex(16))
+        return response
+
+
+async def run(args):
+    """Replay the trace through the coordinator and collect timings."""
+    exchanges = [exchange for trace in args.trace for exchange in read_trace(trace)]
+    server = ReplayServer(exchanges, recorded_latency=args.latency == "recorded")
+    await server.start()
+    hass = HomeAssistant(tempfile.mkdtemp())
+    # The credentials are redacted in the trace and not checked by the replay
+    hub = CSnetHub("replay", "replay", base_url=server.url)
+    coordinator = CSnetCoordinator(hass, hub)
+
+    durations = []
+    failures = []
+    profiler = cProfile.Profile() if args.profile else None
+    try:
+        for _ in range(args.polls):
+            # Each poll replays a fresh response instead of the hub's cache
+            hub.invalidate_elements()
+            start = time.perf_counter()
+            if profiler:
+                profiler.enable()
+            await coordinator.async_refresh()
+            if profiler:
+                profiler.disable()
+            durations.append(time.perf_counter() - start)
+            if not coordinator.last_update_success:
+                failures.append(repr(coordinator.last_exception))
+    finally:
+        await hub.close()
+        await hass.async_stop(force=True)
+        await server.stop()
+
+    if profiler:
+        stats = pstats.Stats(profiler, stream=sys.stderr)
+        stats.sort_stats("cumulative").print_stats(args.profile_lines)
+    return {
+        "polls": args.polls,
+        "failed_polls": len(failures),
+        "failures": sorted(set(failures)),
+        "elements": len(coordinator.data or {}),
+        "poll_mean_ms": round(sum(durations) / len(durations) * 1000, 2) if durations else 0.0,
+        "poll_max_ms": round(max(durations, default=0.0) * 1000, 2),
+        "served": dict(server.served),
+        "metrics": hub.metrics.as_dict(),
+    }
+
+
+def main(argv=None):
+    """Parse the arguments and replay the trace."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("trace", nargs="+", help="wire trace files written by the integration, oldest first")
+    parser.add_argument("--polls", type=int, default=10)
+    parser.add_argument("--latency", choices=("none", "recorded"), default="none")
+    parser.add_argument("--profile", action="store_true", help="print a cProfile of the polls to stderr")
+    parser.add_argument("--profile-lines", type=int, default=25)
+    args = parser.parse_args(argv)
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
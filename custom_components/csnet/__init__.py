@@ -1,53 +1,284 @@
 # __init__.py
+import re
+
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE, Platform
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.storage import Store
+from homeassistant.util.ssl import get_default_context
 import logging
 
-from .const import DOMAIN
+from .const import (
+    CONF_BACKOFF_FACTOR,
+    CONF_MAX_INTERVAL,
+    CONF_MIN_INTERVAL,
+    CONF_STALE_BUDGET,
+    CONF_STATISTICS,
+    CONF_WIRE_TRACE,
+    DEFAULT_BACKOFF_FACTOR,
+    DEFAULT_MAX_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
+    DEFAULT_STALE_BUDGET,
+    DATA_CONNECTOR,
+    DATA_HUBS,
+    DATA_SESSIONS,
+    DOMAIN,
+    EVENT_COMMAND_RESULT,
+    OUTBOX_STORAGE_KEY,
+    SESSION_STORAGE_KEY,
+    SNAPSHOT_STORAGE_KEY,
+    STATISTICS_STORAGE_KEY,
+    STORAGE_VERSION,
+    WIRE_TRACE_FILE,
+)
 from .coordinator import CSnetCoordinator
-from .hub import CSnetHub
+from .hub import CSnetHub, create_connector
+from .sensor import ELEMENT_SENSORS
+from .services import async_setup_services, async_unload_services
+from .statistics import HourlyStatistics
+from .wiretrace import WireRecorder
 
 _LOGGER = logging.getLogger(__name__)
 
+# Seconds to collect outbox changes before they are written
+OUTBOX_SAVE_DELAY = 1
+
 PLATFORMS: list[Platform] = [Platform.CLIMATE, Platform.WATER_HEATER, Platform.SENSOR]  # Add Platform.SENSOR
 
+# Unique IDs built from the elementType alone, and their (parentId, elementType) successors
+LEGACY_UNIQUE_IDS = {
+    Platform.CLIMATE: (re.compile(r"hitachi_pumproom(?P<type>.+)"), "hitachi_pump_{parent}_{type}"),
+    Platform.WATER_HEATER: (re.compile(r"hitachi_pump_water_room(?P<type>.+)"), "hitachi_pump_water_{parent}_{type}"),
+    Platform.SENSOR: (
+        re.compile(
+            r"hitachi_pump_room(?P<type>.+?)_(?P<field>%s)"
+            % "|".join(description.key for description in ELEMENT_SENSORS)
+        ),
+        "hitachi_pump_{parent}_{type}_{field}",
+    ),
+}
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up csnet from a config entry."""
     _LOGGER.debug("Setting up csnet integration.")
     hass.data.setdefault(DOMAIN, {})
-    hub = CSnetHub(entry.data["username"], entry.data["password"])
-    coordinator = CSnetCoordinator(hass, hub)
+    hub = await _async_acquire_hub(hass, entry)
+    entry.async_on_unload(lambda: _release_hub(hass, entry))
+
+    store = _session_store(hass, entry)
+    entry.async_on_unload(
+        hub.add_session_listener(lambda: hass.async_create_task(store.async_save(hub.export_session())))
+    )
+    outbox_store = _outbox_store(hass, entry)
+    entry.async_on_unload(
+        hub.outbox.add_listener(lambda result: outbox_store.async_delay_save(hub.outbox.as_dict, OUTBOX_SAVE_DELAY))
+    )
+
+    if entry.options.get(CONF_WIRE_TRACE):
+        entry.async_on_unload(_start_wire_trace(hass, hub))
 
-    _LOGGER.debug("Coordinator created. Refreshing data for the first time.")
-    await coordinator.async_config_entry_first_refresh()
+    statistics = None
+    if entry.options.get(CONF_STATISTICS):
+        if "recorder" in hass.config.components:
+            statistics = HourlyStatistics(hass, _statistics_store(hass, entry))
+            await statistics.async_restore()
+            statistics.async_start()
+        else:
+            _LOGGER.warning("Statistics mode needs the recorder, keeping regular state history.")
+
+    coordinator = CSnetCoordinator(
+        hass,
+        hub,
+        min_interval=entry.options.get(CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL),
+        max_interval=entry.options.get(CONF_MAX_INTERVAL, DEFAULT_MAX_INTERVAL),
+        backoff_factor=entry.options.get(CONF_BACKOFF_FACTOR, DEFAULT_BACKOFF_FACTOR),
+        statistics=statistics,
+        store=_snapshot_store(hass, entry),
+        stale_budget=entry.options.get(CONF_STALE_BUDGET, DEFAULT_STALE_BUDGET),
+    )
+
+    if await coordinator.async_restore():
+        # Entities start from the last snapshot; the cloud is asked in the background
+        _LOGGER.debug("Coordinator restored. Refreshing data in the background.")
+        entry.async_create_background_task(hass, coordinator.async_refresh(), "csnet first refresh")
+    else:
+        _LOGGER.debug("Coordinator created. Refreshing data for the first time.")
+        await coordinator.async_config_entry_first_refresh()
 
     hass.data[DOMAIN][entry.entry_id] = coordinator
+    async_setup_services(hass)
+    await _async_migrate_unique_ids(hass, entry, coordinator)
     _LOGGER.debug("Coordinator stored in hass.data.")
 
     # Forward setup for all platforms
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     _LOGGER.debug("Platforms forwarded.")
 
+    # Apply changed options by reloading the entry
+    entry.async_on_unload(entry.add_update_listener(_options_listener(entry.options)))
+
     return True
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     _LOGGER.debug("Unloading csnet integration.")
 
+    # Unload all platforms
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+
+    # The hub itself is released by the unload callback registered in setup
     if DOMAIN in hass.data and entry.entry_id in hass.data[DOMAIN]:
-        coordinator = hass.data[DOMAIN][entry.entry_id]
-        if coordinator and coordinator.hub:
-            _LOGGER.debug("Closing hub session.")
-            await coordinator.hub.close()  # Close the session
-        hass.data[DOMAIN].pop(entry.entry_id)
+        coordinator = hass.data[DOMAIN].pop(entry.entry_id)
         _LOGGER.debug("Coordinator removed from hass.data.")
+        async_unload_services(hass)
+        if coordinator.statistics is not None:
+            await coordinator.statistics.async_stop()
 
-    # Unload all platforms
-    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
         _LOGGER.debug("All platforms unloaded successfully.")
     else:
         _LOGGER.error("Failed to unload one or more platforms.")
 
     return unload_ok
+
+async def _async_migrate_unique_ids(hass: HomeAssistant, entry: ConfigEntry, coordinator) -> None:
+    """Move entities from elementType unique IDs to (parentId, elementType) ones."""
+    # Elements used to be keyed by type alone, so a later unit replaced an
+    # earlier one: the old entities belong to the last element of each type
+    by_type = {str(element.element_type): element for element in coordinator.index.elements.values()}
+    registry = er.async_get(hass)
+
+    @callback
+    def _migrate(entity_entry: er.RegistryEntry):
+        legacy = LEGACY_UNIQUE_IDS.get(entity_entry.domain)
+        if legacy is None or (match := legacy[0].fullmatch(entity_entry.unique_id)) is None:
+            return None
+        element = by_type.get(match["type"])
+        if element is None:
+            return None
+        unique_id = legacy[1].format(parent=element.parent_id, **match.groupdict())
+        if registry.async_get_entity_id(entity_entry.domain, DOMAIN, unique_id):
+            _LOGGER.warning("Not migrating %s, %s already exists", entity_entry.entity_id, unique_id)
+            return None
+        _LOGGER.debug("Migrating %s to unique ID %s", entity_entry.entity_id, unique_id)
+        return {"new_unique_id": unique_id}
+
+    await er.async_migrate_entries(hass, entry.entry_id, _migrate)
+
+def _start_wire_trace(hass: HomeAssistant, hub: CSnetHub):
+    """Record the exchanges of the hub; returns a callback that stops recording."""
+    recorder = hub.recorder = WireRecorder(hass.config.path(WIRE_TRACE_FILE))
+    _LOGGER.warning("Recording redacted CSNet traffic to %s", recorder.path)
+
+    def stop():
+        if hub.recorder is recorder:
+            hub.recorder = None
+        recorder.close()
+
+    return stop
+
+async def _async_acquire_hub(hass: HomeAssistant, entry: ConfigEntry) -> CSnetHub:
+    """Return the hub of the entry's account, creating it on first use.
+
+    Entries for the same account share one hub and its login; every account
+    shares the connection pool of this Home Assistant instance.
+    """
+    hubs = hass.data[DOMAIN].setdefault(DATA_HUBS, {})
+    account = entry.data["username"].lower()
+    # Left by the config flow, which just logged in with these credentials
+    session = hass.data[DOMAIN].get(DATA_SESSIONS, {}).pop(account, None)
+    if account in hubs:
+        hub, entry_ids = hubs[account]
+        entry_ids.add(entry.entry_id)
+        # A reauthenticated entry brings the new password to the shared hub
+        hub.set_password(entry.data["password"])
+        hub.restore_session(session)
+        return hub
+
+    hub = CSnetHub(entry.data["username"], entry.data["password"], connector=async_get_connector(hass))
+    hubs[account] = (hub, {entry.entry_id})
+    store = _session_store(hass, entry)
+    if session is not None:
+        # The config flow just logged in; keep its session instead of a new login
+        await store.async_save(session)
+    else:
+        # Reuse the session from the previous run to skip the login on startup
+        session = await store.async_load()
+    hub.restore_session(session)
+    # Commands that could not be sent before the restart are replayed after
+    # the first successful poll
+    hub.outbox.restore(await _outbox_store(hass, entry).async_load())
+    hub.outbox.add_listener(lambda result: _fire_command_result(hass, result))
+    return hub
+
+@callback
+def _fire_command_result(hass: HomeAssistant, result) -> None:
+    """Publish the outcome of a replayed or expired command on the event bus."""
+    if result is not None:
+        hass.bus.async_fire(EVENT_COMMAND_RESULT, result)
+
+def _release_hub(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Drop the entry's reference to its hub and close the hub when unused."""
+    hubs = hass.data[DOMAIN][DATA_HUBS]
+    account = entry.data["username"].lower()
+    hub, entry_ids = hubs[account]
+    entry_ids.discard(entry.entry_id)
+    if not entry_ids:
+        del hubs[account]
+        _LOGGER.debug("Closing hub session.")
+        hass.async_create_task(hub.close())
+
+def async_get_connector(hass: HomeAssistant):
+    """Return the connection pool shared by all CSNet accounts and the config flow."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_CONNECTOR not in domain_data:
+        connector = domain_data[DATA_CONNECTOR] = create_connector(get_default_context())
+
+        async def _async_close_connector(event: Event) -> None:
+            """Close the connection pool."""
+            await connector.close()
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, _async_close_connector)
+    return domain_data[DATA_CONNECTOR]
+
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the config entry after its options changed."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+def _options_listener(options):
+    """Return an update listener that reloads the entry only if its options differ from `options`.
+
+    Reauthentication changes the entry data and schedules its own reload.
+    """
+    options = dict(options)
+
+    async def async_options_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
+        if entry.options != options:
+            await async_reload_entry(hass, entry)
+
+    return async_options_updated
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the persisted session, snapshot, outbox and open statistics hour when the config entry is deleted."""
+    await _session_store(hass, entry).async_remove()
+    await _snapshot_store(hass, entry).async_remove()
+    await _outbox_store(hass, entry).async_remove()
+    await _statistics_store(hass, entry).async_remove()
+
+def _session_store(hass: HomeAssistant, entry: ConfigEntry) -> Store:
+    """Return the store holding the session cookies of a config entry."""
+    # Private stores are written with owner-only permissions
+    return Store(hass, STORAGE_VERSION, SESSION_STORAGE_KEY.format(entry_id=entry.entry_id), private=True)
+
+def _snapshot_store(hass: HomeAssistant, entry: ConfigEntry) -> Store:
+    """Return the store holding the last good element snapshot of a config entry."""
+    return Store(hass, STORAGE_VERSION, SNAPSHOT_STORAGE_KEY.format(entry_id=entry.entry_id))
+
+def _outbox_store(hass: HomeAssistant, entry: ConfigEntry) -> Store:
+    """Return the store holding the commands still to be sent for a config entry."""
+    return Store(hass, STORAGE_VERSION, OUTBOX_STORAGE_KEY.format(entry_id=entry.entry_id))
+
+def _statistics_store(hass: HomeAssistant, entry: ConfigEntry) -> Store:
+    """Return the store holding the statistics hour in progress of a config entry."""
+    return Store(hass, STORAGE_VERSION, STATISTICS_STORAGE_KEY.format(entry_id=entry.entry_id))
@@ -0,0 +1,80 @@
+# breaker.py
+import logging
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# Consecutive failed requests that open the circuit
+FAILURE_THRESHOLD = 5
+# Seconds to stay open before letting a probe request through
+RESET_TIMEOUT = 60
+
+
+class CircuitBreaker:
+    """Stops calling the CSNet cloud after repeated failures.
+
+    After FAILURE_THRESHOLD consecutive failures the circuit opens and requests
+    are refused without touching the network. Once RESET_TIMEOUT has passed a
+    single probe request is let through (half-open); its outcome closes the
+    circuit again or reopens it.
+    """
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT) -> None:
+        """Initialize a closed circuit."""
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def allow_request(self):
+        """Return True if a request may be sent now."""
+        if self.state == STATE_CLOSED:
+            return True
+        if self.state == STATE_OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self.state = STATE_HALF_OPEN
+            _LOGGER.debug("Circuit half-open, probing CSNet.")
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self):
+        """Close the circuit after a request reached the server."""
+        if self.state != STATE_CLOSED:
+            _LOGGER.info("CSNet is reachable again.")
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        """Count a failed request and open the circuit when needed."""
+        self.failures += 1
+        self._probing = False
+        if self.state == STATE_HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != STATE_OPEN:
+                _LOGGER.warning(
+                    "CSNet failed %d times in a row, pausing requests for %s seconds.",
+                    self.failures,
+                    self.reset_timeout,
+                )
+            self.state = STATE_OPEN
+            self._opened_at = time.monotonic()
+
+    def release(self):
+        """Let a new probe through after one that ended without an outcome."""
+        self._probing = False
+
+    @property
+    def retry_after(self):
+        """Return the seconds until the next probe is allowed, 0 if not open."""
+        if self.state != STATE_OPEN:
+            return 0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
@@ -1,6 +1,7 @@
 """Config flow for csnet integration."""
 from __future__ import annotations
 
+from collections.abc import Mapping
 import logging
 from typing import Any
 
@@ -8,11 +9,26 @@ import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.exceptions import HomeAssistantError
 
-from .const import DOMAIN
+from . import async_get_connector
+from .const import (
+    CONF_BACKOFF_FACTOR,
+    CONF_MAX_INTERVAL,
+    CONF_MIN_INTERVAL,
+    CONF_STALE_BUDGET,
+    CONF_STATISTICS,
+    CONF_WIRE_TRACE,
+    DEFAULT_BACKOFF_FACTOR,
+    DEFAULT_MAX_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
+    DEFAULT_STALE_BUDGET,
+    DATA_SESSIONS,
+    DOMAIN,
+)
+from .hub import CSnetAuthError, CSnetError, CSnetHub
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -26,7 +42,29 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
 
 
 async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
-    return {"title": "Hitachi heatpump"}
+    """Validate the user input allows us to connect.
+
+    Logs in to CSNet and returns the title of the entry and the session of
+    that login, so the entry can start without logging in again.
+    """
+    hub = CSnetHub(data[CONF_USERNAME], data[CONF_PASSWORD], connector=async_get_connector(hass))
+    try:
+        await hub.auth()
+        session = hub.export_session()
+    except CSnetAuthError as err:
+        raise InvalidAuth from err
+    except CSnetError as err:
+        raise CannotConnect from err
+    finally:
+        await hub.close()
+
+    return {"title": "Hitachi heatpump", "session": session}
+
+
+@callback
+def _async_hand_off_session(hass: HomeAssistant, username: str, session: dict[str, Any]) -> None:
+    """Leave the session of a validation login for the setup of its entry."""
+    hass.data.setdefault(DOMAIN, {}).setdefault(DATA_SESSIONS, {})[username.lower()] = session
 
 
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -50,12 +88,104 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 _LOGGER.exception("Unexpected exception")
                 errors["base"] = "unknown"
             else:
+                _async_hand_off_session(self.hass, user_input[CONF_USERNAME], info["session"])
                 return self.async_create_entry(title=info["title"], data=user_input)
 
         return self.async_show_form(
             step_id="user", data_schema=STEP_USER_DATA_SCHEMA, errors=errors
         )
 
+    async def async_step_reauth(self, entry_data: Mapping[str, Any]) -> FlowResult:
+        """Handle a password CSNet no longer accepts."""
+        self._reauth_entry = self.hass.config_entries.async_get_entry(self.context["entry_id"])
+        return await self.async_step_reauth_confirm()
+
+    async def async_step_reauth_confirm(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Ask for the new password and validate it."""
+        errors: dict[str, str] = {}
+        username = self._reauth_entry.data[CONF_USERNAME]
+        if user_input is not None:
+            data = {**self._reauth_entry.data, CONF_PASSWORD: user_input[CONF_PASSWORD]}
+            try:
+                info = await validate_input(self.hass, data)
+            except CannotConnect:
+                errors["base"] = "cannot_connect"
+            except InvalidAuth:
+                errors["base"] = "invalid_auth"
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Unexpected exception")
+                errors["base"] = "unknown"
+            else:
+                _async_hand_off_session(self.hass, username, info["session"])
+                return self.async_update_reload_and_abort(self._reauth_entry, data=data)
+
+        return self.async_show_form(
+            step_id="reauth_confirm",
+            data_schema=vol.Schema({vol.Required(CONF_PASSWORD): str}),
+            description_placeholders={"username": username},
+            errors=errors,
+        )
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> OptionsFlowHandler:
+        """Create the options flow."""
+        return OptionsFlowHandler(config_entry)
+
+
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle the polling options for csnet."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize options flow."""
+        self._entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the polling interval bounds."""
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            if user_input[CONF_MAX_INTERVAL] < user_input[CONF_MIN_INTERVAL]:
+                errors["base"] = "invalid_interval"
+            else:
+                return self.async_create_entry(title="", data=user_input)
+
+        options = self._entry.options
+        data_schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_MIN_INTERVAL,
+                    default=options.get(CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=5, max=3600)),
+                vol.Required(
+                    CONF_MAX_INTERVAL,
+                    default=options.get(CONF_MAX_INTERVAL, DEFAULT_MAX_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=5, max=3600)),
+                vol.Required(
+                    CONF_BACKOFF_FACTOR,
+                    default=options.get(CONF_BACKOFF_FACTOR, DEFAULT_BACKOFF_FACTOR),
+                ): vol.All(vol.Coerce(float), vol.Range(min=1.0, max=4.0)),
+                vol.Required(
+                    CONF_STALE_BUDGET,
+                    default=options.get(CONF_STALE_BUDGET, DEFAULT_STALE_BUDGET),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=86400)),
+                vol.Required(
+                    CONF_STATISTICS,
+                    default=options.get(CONF_STATISTICS, False),
+                ): bool,
+                vol.Required(
+                    CONF_WIRE_TRACE,
+                    default=options.get(CONF_WIRE_TRACE, False),
+                ): bool,
+            }
+        )
+        return self.async_show_form(step_id="init", data_schema=data_schema, errors=errors)
+
 
 class CannotConnect(HomeAssistantError):
     """Error to indicate we cannot connect."""
@@ -1,4 +1,35 @@
 """Constants for the csnet integration."""
 
 DOMAIN = "csnet"
-ELEMENT_PREFIX = "room"
\ No newline at end of file
+ELEMENT_PREFIX = "room"
+
+# hass.data[DOMAIN] keys shared by all config entries
+DATA_CONNECTOR = "connector"
+DATA_HUBS = "hubs"
+# Sessions of logins made by the config flow, waiting for their entry's setup
+DATA_SESSIONS = "sessions"
+# The Profiler of a running csnet.profile service call
+DATA_PROFILER = "profiler"
+
+STORAGE_VERSION = 1
+SESSION_STORAGE_KEY = DOMAIN + ".{entry_id}.session"
+SNAPSHOT_STORAGE_KEY = DOMAIN + ".{entry_id}.snapshot"
+OUTBOX_STORAGE_KEY = DOMAIN + ".{entry_id}.outbox"
+STATISTICS_STORAGE_KEY = DOMAIN + ".{entry_id}.statistics"
+
+# Fired with the outcome of every queued command that was replayed or dropped
+EVENT_COMMAND_RESULT = DOMAIN + "_command_result"
+
+CONF_MIN_INTERVAL = "min_interval"
+CONF_MAX_INTERVAL = "max_interval"
+CONF_BACKOFF_FACTOR = "backoff_factor"
+CONF_STATISTICS = "statistics"
+CONF_WIRE_TRACE = "wire_trace"
+CONF_STALE_BUDGET = "stale_budget"
+# Trace file in the configuration directory, see wiretrace.py
+WIRE_TRACE_FILE = "csnet_wire.jsonl.gz"
+DEFAULT_MIN_INTERVAL = 10
+DEFAULT_MAX_INTERVAL = 300
+DEFAULT_BACKOFF_FACTOR = 1.5
+# Seconds the last good data is served while CSNet fails
+DEFAULT_STALE_BUDGET = 900
@@ -1,16 +1,50 @@
 from asyncio import timeout
+from dataclasses import asdict
 from datetime import timedelta
 import logging
 
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.core import callback
+from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.helpers.update_coordinator import TimestampDataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DEFAULT_BACKOFF_FACTOR,
+    DEFAULT_MAX_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
+    DEFAULT_STALE_BUDGET,
+    ELEMENT_PREFIX,
+)
+from .hub import CSnetAuthError
+from .models import CSnetElement, ElementIndex
+from .orders import ORDER_CONFIRMED, ORDER_PENDING, ORDER_REJECTED
 
 _LOGGER = logging.getLogger(__name__)
 
+# Seconds a whole refresh may take, including retries
+UPDATE_TIMEOUT = 45
+
+# Seconds to collect changes before the snapshot is written to disk
+SNAPSHOT_SAVE_DELAY = 60
+
+# Element fields that only change when someone operates the heat pump
+CONTROL_FIELDS = ("on_off", "setting_temperature")
 
-class CSnetCoordinator(DataUpdateCoordinator):
+
+class CSnetCoordinator(TimestampDataUpdateCoordinator):
     """My custom coordinator."""
 
-    def __init__(self, hass, hub):
+    def __init__(
+        self,
+        hass,
+        hub,
+        min_interval=DEFAULT_MIN_INTERVAL,
+        max_interval=DEFAULT_MAX_INTERVAL,
+        backoff_factor=DEFAULT_BACKOFF_FACTOR,
+        statistics=None,
+        store=None,
+        stale_budget=DEFAULT_STALE_BUDGET,
+    ):
         """Initialize my coordinator."""
         super().__init__(
             hass,
@@ -18,9 +52,69 @@ class CSnetCoordinator(DataUpdateCoordinator):
             # Name of the data. For logging purposes.
             name="csnet",
             # Polling interval. Will only be polled if there are subscribers.
-            update_interval=timedelta(seconds=30),
+            update_interval=timedelta(seconds=min_interval),
         )
         self.hub = hub
+        # HourlyStatistics fed by the sensors when statistics mode is on
+        self.statistics = statistics
+        # Installation-level fields of the last refresh, such as avOuTemp
+        self.installation = {}
+        # The elements of the last refresh by unit and kind; data maps
+        # (parentId, elementType) to the element
+        self.index = ElementIndex()
+        # Store of the last good snapshot; True while the data comes from it
+        self._store = store
+        self.restored = False
+        self._min_interval = timedelta(seconds=min_interval)
+        self._max_interval = timedelta(seconds=max(min_interval, max_interval))
+        self._backoff_factor = backoff_factor
+        # How long the last good data stays usable while refreshes fail
+        self._stale_budget = timedelta(seconds=stale_budget)
+        self._expiry_notified = False
+        # Contexts (element keys) whose listeners the next notification wakes;
+        # None wakes every listener
+        self._changed = None
+        self._notified_success = None
+        self._unsub_orders = hub.orders.add_listener(self._async_order_changed)
+
+    async def async_shutdown(self) -> None:
+        """Stop following the orders of a hub that may outlive this coordinator."""
+        await super().async_shutdown()
+        if self._unsub_orders is not None:
+            self._unsub_orders()
+            self._unsub_orders = None
+
+    def element_name(self, element):
+        """Return the entity name of an element, unique across indoor units."""
+        if len(self.index.by_unit) > 1:
+            return f"{ELEMENT_PREFIX}{element.parent_id}_{element.element_type}"
+        return ELEMENT_PREFIX + str(element.element_type)
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update the listeners whose element changed since the last refresh."""
+        changed, self._changed = self._changed, None
+        if changed is None or self.last_update_success != self._notified_success:
+            # Availability changed or the caller did not compute a diff
+            self._notified_success = self.last_update_success
+            super().async_update_listeners()
+            return
+        for update_callback, context in list(self._listeners.values()):
+            if context is None or context in changed:
+                update_callback()
+
+    @callback
+    def _async_order_changed(self, order):
+        """Poll fast while a write is outstanding and roll back failed ones."""
+        if order.status == ORDER_PENDING:
+            if self.update_interval != self._min_interval:
+                self.update_interval = self._min_interval
+                self._schedule_refresh()
+        elif order.status == ORDER_REJECTED:
+            # The entity re-reads the polled state, dropping its optimistic
+            # values; timed out orders are handled with the refresh instead
+            self._changed = {order.key}
+            self.async_update_listeners()
 
     async def _async_update_data(self):
         """Fetch data from API endpoint.
@@ -29,15 +123,128 @@ class CSnetCoordinator(DataUpdateCoordinator):
         so entities can quickly look up their data.
         """
         try:
-            # Note: asyncio.TimeoutError and aiohttp.ClientError are already
-            # handled by the data update coordinator.
-            async with timeout(10):
-                data = await self.hub.update()
-                mapped = {}
-                for element in data:
-                    mapped[element["elementType"]] = element
-                return mapped
-        except Exception as err:
+            # Leaves room for a login and the hub's retries of the GET
+            async with timeout(UPDATE_TIMEOUT):
+                index = await self.hub.update()
+        except CSnetAuthError as err:
+            if not self.hub.credentials_rejected:
+                # A missing token or cookie, or a session refused right after
+                # login, is a server fault and not a wrong password
+                self._handle_outage()
+                raise UpdateFailed(f"Error authenticating with CSNet: {err}") from err
             # Raising ConfigEntryAuthFailed will cancel future updates
             # and start a config flow with SOURCE_REAUTH (async_step_reauth)
-            raise UpdateFailed(f"Error communicating with API: {err}") from err
\ No newline at end of file
+            raise ConfigEntryAuthFailed(f"Authentication with CSNet failed: {err}") from err
+        except Exception as err:
+            self._handle_outage()
+            raise UpdateFailed(f"Error communicating with API: {err}") from err
+
+        self._expiry_notified = False
+        installation_changed = self.installation != self.hub.last_full_data
+        self.installation = self.hub.last_full_data
+        self.index = index
+        mapped = index.elements
+
+        finished = self.hub.orders.match(mapped)
+        confirmed = {order.key for order in finished if order.status == ORDER_CONFIRMED}
+        self._adapt_interval(self.data, mapped, confirmed)
+        if not self.last_update_success:
+            # Back from an outage: follow closely what changed meanwhile
+            self.update_interval = self._min_interval
+        self._changed = self._diff(self.data, mapped) | {order.key for order in finished}
+        if self.restored:
+            # Every entity drops its restored marker
+            self.restored = False
+            self._changed = None
+        if self._store is not None and (self._changed is None or self._changed or installation_changed):
+            self._store.async_delay_save(self._snapshot, SNAPSHOT_SAVE_DELAY)
+        return mapped
+
+    @property
+    def stale(self):
+        """Return True while the data is from before a failed refresh."""
+        return not self.last_update_success and self.data is not None
+
+    @property
+    def data_available(self):
+        """Return True while the data is fresh or within the staleness budget."""
+        if self.last_update_success:
+            return True
+        last_success = self.last_update_success_time
+        return last_success is not None and dt_util.utcnow() - last_success <= self._stale_budget
+
+    def _handle_outage(self):
+        """Back off while CSNet fails and drop the stale data once it is too old."""
+        self.update_interval = min(self.update_interval * self._backoff_factor, self._max_interval)
+        if self.stale and not self.data_available and not self._expiry_notified:
+            # The base class only notifies when the success state flips, which
+            # already happened at the start of the outage
+            _LOGGER.warning("CSNet data is older than %s, marking entities unavailable", self._stale_budget)
+            self._expiry_notified = True
+            self._changed = None
+            self.async_update_listeners()
+
+    async def async_restore(self):
+        """Load the last good snapshot as the current data.
+
+        Returns True if a snapshot was restored; entities can then be set up
+        before the first refresh, which the caller runs in the background.
+        """
+        if self._store is None or (snapshot := await self._store.async_load()) is None:
+            return False
+        try:
+            index = ElementIndex(CSnetElement(**element) for element in snapshot["elements"])
+        except (KeyError, TypeError) as err:
+            _LOGGER.warning("Ignoring unreadable snapshot: %s", err)
+            return False
+        self.installation = snapshot["installation"]
+        self.index = index
+        # The budget for serving the snapshot counts from when it was fetched
+        self.last_update_success_time = dt_util.parse_datetime(snapshot.get("fetched_at") or "")
+        self.restored = True
+        # No entity listens yet; the refresh timestamp stays unset
+        self.data = index.elements
+        _LOGGER.debug("Restored %d elements from the last snapshot", len(index))
+        return True
+
+    def _snapshot(self):
+        """Return the data to persist as the last good snapshot."""
+        fetched_at = self.last_update_success_time
+        return {
+            "fetched_at": fetched_at.isoformat() if fetched_at else None,
+            "installation": self.installation,
+            "elements": [asdict(element) for element in self.index.elements.values()],
+        }
+
+    @staticmethod
+    def _diff(previous, mapped):
+        """Return the keys of elements that were added, removed or changed."""
+        if previous is None:
+            return set(mapped)
+        changed = {idx for idx, element in mapped.items() if previous.get(idx) != element}
+        changed.update(idx for idx in previous if idx not in mapped)
+        return changed
+
+    def _adapt_interval(self, previous, mapped, confirmed):
+        """Pick the next polling interval from how the elements changed."""
+        if self.hub.orders.has_pending:
+            interval = self._min_interval
+        else:
+            interval = min(self.update_interval * self._backoff_factor, self._max_interval)
+            if previous:
+                for idx, element in mapped.items():
+                    if idx in confirmed or idx not in previous:
+                        continue
+                    old = previous[idx]
+                    if any(getattr(old, key) != getattr(element, key) for key in CONTROL_FIELDS):
+                        # Changed from the app or the unit itself: follow it closely
+                        interval = self._min_interval
+                        break
+                    if old.current_temperature != element.current_temperature:
+                        # Readings are still moving, hold the current pace
+                        interval = min(interval, self.update_interval)
+
+        if interval != self.update_interval:
+            _LOGGER.debug("Polling interval changed to %s", interval)
+        self.update_interval = interval
+
@@ -0,0 +1,48 @@
+"""Diagnostics support for csnet."""
+from __future__ import annotations
+
+from dataclasses import asdict
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+
+TO_REDACT = {CONF_USERNAME, CONF_PASSWORD}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    hub = coordinator.hub
+    last_success = coordinator.last_update_success_time
+
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "last_update_success_time": last_success,
+            "seconds_since_last_success": (
+                (dt_util.utcnow() - last_success).total_seconds() if last_success else None
+            ),
+            "poll_interval": coordinator.update_interval.total_seconds(),
+            "restored": coordinator.restored,
+            "stale": coordinator.stale,
+            "data_available": coordinator.data_available,
+            "elements": [asdict(element) for element in (coordinator.data or {}).values()],
+        },
+        "hub": {
+            "connection": hub.state,
+            "logins": hub.metrics.logins,
+            "circuit": hub.breaker.state,
+            "pending_orders": hub.orders.has_pending,
+            "outbox": hub.outbox.as_dict(),
+            "metrics": hub.metrics.as_dict(),
+        },
+    }
@@ -0,0 +1,59 @@
+# entity.py
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+
+class CSnetEntity(CoordinatorEntity):
+    """Base of the entities controlling one element of the installation.
+
+    Subclasses return the parts of their state shown in Home Assistant from
+    `_visible_state`; the state is only written when those, the availability
+    or the restored and stale flags change.
+    """
+
+    def __init__(self, coordinator, parentId, idx) -> None:
+        """Initialize the entity for the element (parentId, idx)."""
+        # Elements are identified by their indoor unit and circuit
+        self._key = (parentId, idx)
+        super().__init__(coordinator, context=self._key)
+        self._parentId = parentId
+        self.idx = idx
+        self.hub = coordinator.hub
+        # Last state written to Home Assistant, to skip identical writes
+        self._written_state = None
+
+    @property
+    def available(self) -> bool:
+        """Stay available on the last good data within the staleness budget."""
+        return self.coordinator.data_available
+
+    @property
+    def _visible_state(self):
+        """Return the values of the entity shown in Home Assistant."""
+        raise NotImplementedError
+
+    async def async_added_to_hass(self) -> None:
+        """Populate the state from the current coordinator data."""
+        await super().async_added_to_hass()
+        self._handle_coordinator_update()
+
+    @callback
+    def _async_write_state_if_changed(self) -> None:
+        """Write the state only if something visible changed."""
+        state = (self.available, *self._visible_state, self.coordinator.restored, self.coordinator.stale)
+        if state != self._written_state:
+            self._written_state = state
+            self.async_write_ha_state()
+
+    @property
+    def extra_state_attributes(self):
+        """Return diagnostic attributes."""
+        attributes = {
+            # Set until the first refresh replaces the snapshot loaded at startup
+            "restored": self.coordinator.restored,
+        }
+        if self.coordinator.stale:
+            # Serving the last good data while CSNet fails
+            attributes["stale"] = True
+            attributes["last_success"] = self.coordinator.last_update_success_time
+        return attributes
@@ -1,335 +1,748 @@
 # hub.py
-import json
+import asyncio
 import logging
+import random
 import time
+from urllib.parse import urlencode
 
-import requests
 import aiohttp
+from yarl import URL
+
+from .breaker import CircuitBreaker
+from .metrics import HubMetrics
+from .models import KIND_WATER_HEATER, CSnetElement, ElementIndex
+from .orders import OrderTracker
+from .outbox import RESULT_FAILED, RESULT_SENT, CommandOutbox
+from .wiretrace import redact_body
+
+try:
+    # orjson parses straight from bytes and is several times faster
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 _LOGGER = logging.getLogger(__name__)
 
+BASE_URL = "https://www.csnetmanager.com"
+LOGIN_PATH = "/login"
+ELEMENTS_PATH = "/data/elements"
+HEAT_SETTING_PATH = "/data/indoor/heat_setting"
+
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=5)
+# Connection pool settings shared by all accounts of a Home Assistant instance
+CONNECTIONS_PER_HOST = 8
+DNS_CACHE_TTL = 300
+# Stay below the 60 s idle timeout of the load balancer in front of CSNet
+KEEPALIVE_TIMEOUT = 55
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+# Extra attempts for idempotent GETs; writes are never retried automatically
+GET_RETRIES = 2
+RETRY_BASE_DELAY = 1.0
+# Bytes of a response body included in debug logs
+LOG_BODY_LIMIT = 2048
+# Seconds to collect commands for the same indoor unit into one write
+COMMAND_DEBOUNCE = 0.3
+# Seconds a fetched elements response answers further update() calls
+ELEMENTS_CACHE_TTL = 2.0
+
+# Connection states of a CSnetHub
+STATE_DISCONNECTED = "disconnected"
+STATE_AUTHENTICATING = "authenticating"
+STATE_CONNECTED = "connected"
+STATE_REJECTED = "rejected"
+STATE_CLOSED = "closed"
+
+
+class CSnetError(Exception):
+    """Base error for CSNet communication problems."""
+
+
+class CSnetConnectionError(CSnetError):
+    """Error to indicate the CSNet server could not be reached."""
+
+
+class CSnetAuthError(CSnetError):
+    """Error to indicate CSNet rejected the credentials or the session."""
+
+
+class CSnetCommandQueued(CSnetConnectionError):
+    """Error to indicate a write could not be sent yet and was queued."""
+
+
+class _LogBody:
+    """Response body that is only truncated, redacted and decoded if it is logged."""
+
+    __slots__ = ("body",)
+
+    def __init__(self, body) -> None:
+        """Wrap the raw body."""
+        self.body = body
+
+    def __str__(self):
+        """Return the redacted, size-capped body."""
+        text = redact_body(self.body[:LOG_BODY_LIMIT]).decode("utf-8", "replace")
+        if len(self.body) > LOG_BODY_LIMIT:
+            text += f"... ({len(self.body)} bytes)"
+        return text
+
+
+class _PendingCommand:
+    """Field changes waiting to be written to one indoor unit."""
+
+    __slots__ = ("fields", "waiters", "handle")
+
+    def __init__(self) -> None:
+        """Initialize an empty pending write."""
+        self.fields = {}
+        self.waiters = []
+        self.handle = None
+
+
+def create_connector(ssl_context=None):
+    """Create a keep-alive connection pool that can be shared by several hubs."""
+    return aiohttp.TCPConnector(
+        ssl=ssl_context if ssl_context is not None else True,
+        limit_per_host=CONNECTIONS_PER_HOST,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+        enable_cleanup_closed=True,
+    )
+
+
 class CSnetHub:
     """Handles communication with the CSNet API."""
 
-    def __init__(self, username, password) -> None:
-        """Initialize the CSnetHub."""
+    def __init__(self, username, password, connector=None, base_url=BASE_URL) -> None:
+        """Initialize the CSnetHub.
+
+        With a shared `connector` the hub keeps its own cookie jar but reuses
+        the pooled connections, and leaves closing the pool to its owner.
+        `base_url` only changes to point the hub at a local stand-in server.
+        """
+        self.base_url = base_url
         self.xsrf = ""
         self.session = None  # Initialize session to None
         self.username = username
         self.password = password
+        self._connector = connector
+        # One of the STATE_* values; while rejected no login is attempted
+        # until the password changes
+        self.state = STATE_DISCONNECTED
+        # Bumped on every login so concurrent callers that saw the same
+        # expired session re-authenticate only once.
+        self._generation = 0
+        self._auth_lock = asyncio.Lock()
+        # Called after every successful login so the session can be persisted
+        self._session_listeners = []
+        self._pending_commands = {}
+        # Outstanding writes, confirmed against each coordinator poll
+        self.orders = OrderTracker()
+        self.breaker = CircuitBreaker()
+        self.metrics = HubMetrics()
+        # Elements from the last poll
+        self._index = ElementIndex()
+        # Installation-level fields of the last poll, without the elements
+        self.last_full_data = {}
+        self._command_tasks = set()
+        # Writes that could not reach CSNet, replayed once it answers again
+        self.outbox = CommandOutbox()
+        self._replay_task = None
+        # Serializes the writes to each indoor unit
+        self._unit_locks = {}
+        # WireRecorder of the exchanges, set while wire tracing is enabled
+        self.recorder = None
+        # The elements fetch in flight, shared by concurrent update() calls
+        self._update_task = None
+        # When the current index was fetched; None once a write made it stale
+        self._index_fetched_at = None
+        # Bumped by every invalidation so a fetch that overlapped a write is
+        # not cached
+        self._cache_generation = 0
+
+    @property
+    def credentials_rejected(self):
+        """Return True if CSNet refused the current password."""
+        return self.state == STATE_REJECTED
+
+    def _set_state(self, state):
+        """Move the connection to `state`."""
+        if state != self.state:
+            _LOGGER.debug("CSNet connection %s -> %s", self.state, state)
+            self.state = state
 
     async def auth(self):
-        """Authenticate and establish a session with CSNet."""
-        url = "https://www.csnetmanager.com"
+        """Authenticate and establish a session with CSNet.
 
+        Callers other than the config flow go through _ensure_session or
+        _reauthenticate, which hold the lock so only one login is in flight.
+        """
+        if self.state == STATE_CLOSED:
+            raise CSnetConnectionError("Hub is closed")
         if self.session is None:
             # Create a session here (only once)
-            self.session = aiohttp.ClientSession(cookie_jar=aiohttp.CookieJar())
-            _LOGGER.debug("Session created.")
+            self._create_session()
+
+        self._set_state(STATE_AUTHENTICATING)
+        try:
+            await self._login()
+        finally:
+            # Any failure other than a rejected password leaves us disconnected
+            if self.state == STATE_AUTHENTICATING:
+                self._set_state(STATE_DISCONNECTED)
+
+    async def _login(self):
+        """Fetch the XSRF token and post the credentials."""
+        started = time.perf_counter()
         try:
             # Perform the GET request to retrieve the XSRF token
-            response = await self.session.get(url + "/login")
-            _LOGGER.info("Initial CSRF Token retrieved.")
+            async with self.session.get(self.base_url + LOGIN_PATH, timeout=REQUEST_TIMEOUT) as response:
+                response_body = await response.read()
+            self.metrics.record_request(0, len(response_body))
+            # The login form carries the XSRF token and is not needed for a replay
+            self._record("GET", LOGIN_PATH, response, None, b"", started)
+            response_text = response_body.decode("utf-8", "replace")
 
             # Extract cookies for the session
-            cookies = self.session.cookie_jar.filter_cookies(url)
+            cookies = self.session.cookie_jar.filter_cookies(self.base_url)
             if "XSRF-TOKEN" in cookies:
                 self.xsrf = cookies["XSRF-TOKEN"].value
-            else:
+            elif "XSRF-TOKEN=" in response_text:
                 # If XSRF-TOKEN is not in cookies, check the response body
-                response_text = await response.text()
-                if "XSRF-TOKEN" in response_text:
-                    self.xsrf = response_text.split("XSRF-TOKEN=")[1].split(";")[0]
-                else:
-                    _LOGGER.error("XSRF-TOKEN not found in cookies or response body.")
-                    return
-
-            AWSALBTG = cookies["AWSALBTG"].value if "AWSALBTG" in cookies else ""
-            AWSALBTGCORS = cookies["AWSALBTGCORS"].value if "AWSALBTGCORS" in cookies else ""
-            _LOGGER.info("XSRF Token: %s", self.xsrf)
-            _LOGGER.info("AWSALBTG: %s", AWSALBTG)
-            _LOGGER.info("AWSALBTGCORS: %s", AWSALBTGCORS)
+                self.xsrf = response_text.split("XSRF-TOKEN=", 1)[1].split(";")[0]
+            else:
+                raise CSnetAuthError("XSRF-TOKEN not found in cookies or response body")
+            _LOGGER.debug("Initial CSRF Token retrieved.")
 
             # Perform the POST request to log in
-            response = await self.session.post(
-                url + "/login",
-                headers={
-                    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    "Content-Type": "application/x-www-form-urlencoded",
-                },
-                cookies={
-                    "AWSALBTG": AWSALBTG,
-                    "AWSALBTGCORS": AWSALBTGCORS,
-                    "XSRF-TOKEN": self.xsrf,
-                },
-                data={
+            form = urlencode(
+                {
                     "username": self.username,
                     "password": self.password,
                     "token": "",
                     "password_unsanitized": self.password,
                     "_csrf": self.xsrf,
+                }
+            )
+            posted = time.perf_counter()
+            async with self.session.post(
+                self.base_url + LOGIN_PATH,
+                headers={
+                    "User-Agent": USER_AGENT,
+                    "Content-Type": "application/x-www-form-urlencoded",
                 },
-                timeout=5,
+                data=form,
+                timeout=REQUEST_TIMEOUT,
                 allow_redirects=False,
+            ) as response:
+                status = response.status
+                location = response.headers.get("Location", "")
+                response_body = await response.read()
+            self.metrics.record_request(len(form), len(response_body))
+            self._record("POST", LOGIN_PATH, response, form, response_body, posted)
+            _LOGGER.debug("Authentication response status: %s", status)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise CSnetConnectionError(f"Error during authentication: {e}") from e
+
+        # A failed login redirects back to the login form instead of the app
+        if status >= 400 or "error" in location or LOGIN_PATH in location:
+            self._set_state(STATE_REJECTED)
+            raise CSnetAuthError(f"Login rejected (status {status})")
+        if "SESSION" not in self.session.cookie_jar.filter_cookies(self.base_url):
+            raise CSnetAuthError("Login did not return a SESSION cookie")
+
+        self._set_state(STATE_CONNECTED)
+        self._generation += 1
+        self.metrics.observe("login", time.perf_counter() - started)
+        _LOGGER.info("Login successful.")
+        for listener in list(self._session_listeners):
+            listener()
+
+    def _create_session(self):
+        """Create the HTTP session with a cookie jar private to this account."""
+        self.session = aiohttp.ClientSession(
+            connector=self._connector,
+            connector_owner=self._connector is None,
+            cookie_jar=aiohttp.CookieJar(),
+        )
+        _LOGGER.debug("Session created.")
+
+    def add_session_listener(self, listener):
+        """Call `listener` after every successful login; returns a remover."""
+        self._session_listeners.append(listener)
+        return lambda: self._session_listeners.remove(listener)
+
+    def export_session(self):
+        """Return the session cookies and XSRF token for persistence."""
+        cookies = {}
+        if self.session is not None and self.state == STATE_CONNECTED:
+            cookies = {cookie.key: cookie.value for cookie in self.session.cookie_jar}
+        return {"xsrf": self.xsrf, "cookies": cookies}
+
+    def restore_session(self, state):
+        """Reuse a previously persisted session without logging in.
+
+        The session is assumed valid; the first request that gets rejected
+        falls back to a fresh login.
+        """
+        if not state or "SESSION" not in state.get("cookies", {}):
+            return
+        if self.session is None:
+            self._create_session()
+        self.session.cookie_jar.update_cookies(state["cookies"], URL(self.base_url))
+        self.xsrf = state["xsrf"]
+        self._set_state(STATE_CONNECTED)
+        _LOGGER.debug("Restored persisted CSNet session.")
+
+    def set_password(self, password):
+        """Replace the password, allowing logins again after a rejection."""
+        if password != self.password:
+            self.password = password
+            if self.state == STATE_REJECTED:
+                self._set_state(STATE_DISCONNECTED)
+
+    def _check_credentials(self):
+        """Refuse to log in with a password CSNet already rejected."""
+        if self.credentials_rejected:
+            raise CSnetAuthError("CSNet rejected the password, reauthentication required")
+
+    async def _ensure_session(self):
+        """Log in unless an authenticated session already exists."""
+        if self.state == STATE_CONNECTED:
+            return
+        async with self._auth_lock:
+            if self.state != STATE_CONNECTED:
+                self._check_credentials()
+                await self.auth()
+
+    async def _reauthenticate(self, generation):
+        """Log in again after the session seen at `generation` expired."""
+        async with self._auth_lock:
+            # Another caller already replaced the expired session
+            if generation != self._generation:
+                return
+            self._check_credentials()
+            _LOGGER.info("CSNet session expired, logging in again.")
+            await self.auth()
+
+    def _record(self, method, path, response, sent, received, started):
+        """Pass an exchange to the wire recorder, if one is attached."""
+        if self.recorder is not None:
+            self.recorder.record(
+                method,
+                path,
+                response.status,
+                response.headers.get("Location"),
+                response.content_type,
+                time.perf_counter() - started,
+                sent,
+                received,
             )
-            _LOGGER.info("Authentication response status: %s", response.status)
-            _LOGGER.info("Session ID: %s", self.session.cookie_jar.filter_cookies(url)["SESSION"].value)
-            _LOGGER.info("Login successful.")
-
-        except Exception as e:
-            _LOGGER.error("Error during authentication: %s", e)
-            if self.session:
-                await self.session.close()
-            self.session = None
-
-    async def update(self):
-        """Fetch updated data from the API."""
-        await self.auth()  # Ensure authentication is done first
 
-        if not self.session:
-            _LOGGER.error("Session is not initialized. Cannot fetch data.")
-            return {}
-
-        url = "https://www.csnetmanager.com/data/elements"
-
-        try:
-            # Fetch elements data
-            response = await self.session.get(
-                url, cookies={"SESSION": self.session.cookie_jar.filter_cookies(url)["SESSION"].value, "XSRF-TOKEN": self.xsrf}, timeout=5
+    @staticmethod
+    def _is_session_expired(response, expect_json):
+        """Return True if the response shows the session is no longer valid."""
+        if response.status >= 500:
+            # Error pages from the load balancer are HTML too
+            return False
+        if response.status in (401, 403):
+            return True
+        if response.status in REDIRECT_STATUSES:
+            return LOGIN_PATH in response.headers.get("Location", "")
+        # CSNet serves the login page with a 200 when a JSON call is not authorised
+        return expect_json and "text/html" in response.headers.get("Content-Type", "")
+
+    async def _request(self, method, path, data=None, headers=None, expect_json=True):
+        """Send a request through the circuit breaker, retrying failed GETs.
+
+        GETs are retried GET_RETRIES times with jittered exponential backoff
+        on transport errors and 5xx answers. Returns the response status and
+        the raw body.
+        """
+        if self.state == STATE_CLOSED:
+            raise CSnetConnectionError("Hub is closed")
+        if not self.breaker.allow_request():
+            raise CSnetConnectionError(
+                f"CSNet unavailable, next attempt in {self.breaker.retry_after:.0f} seconds"
             )
-            # Log the response status and text
-            _LOGGER.info("Fetching elements data. Response status: %s", response.status)
-            text = await response.text()
-            _LOGGER.info("Response text: %s", text)
 
-            if response.status != 200:
-                _LOGGER.error("Failed to fetch data. Status code: %d", response.status)
-                return {}
-
-            # Try to parse the JSON data
+        try:
+            retries = GET_RETRIES if method == "GET" else 0
+            for attempt in range(retries + 1):
+                try:
+                    status, body = await self._authenticated_request(method, path, data, headers, expect_json)
+                except CSnetConnectionError as e:
+                    error = e
+                except CSnetAuthError as e:
+                    # The server answered, so it is reachable
+                    self.breaker.record_success()
+                    self.metrics.record_failure(e)
+                    raise
+                else:
+                    if status < 500:
+                        self.breaker.record_success()
+                        return status, body
+                    error = CSnetConnectionError(f"{path} answered with status {status}")
+
+                if attempt < retries:
+                    delay = RETRY_BASE_DELAY * 2**attempt * random.uniform(0.5, 1.5)
+                    _LOGGER.debug("Retrying %s in %.1f seconds: %s", path, delay, error)
+                    await asyncio.sleep(delay)
+
+            self.breaker.record_failure()
+            self.metrics.record_failure(error)
+            raise error
+        finally:
+            # A probe cut short by anything else must not block the next one
+            self.breaker.release()
+
+    async def _authenticated_request(self, method, path, data, headers, expect_json):
+        """Send an authenticated request, logging in again once if the session expired."""
+        await self._ensure_session()
+
+        for attempt in range(2):
+            generation = self._generation
+            payload = None
+            if data is not None:
+                # The token changes with every login, so inject it per attempt
+                payload = urlencode({**data, "_csrf": self.xsrf})
+                headers = {"Content-Type": "application/x-www-form-urlencoded", **(headers or {})}
+            started = time.perf_counter()
             try:
-                data = json.loads(text)
-                _LOGGER.debug(f"Parsed data: {data}")
-                self.last_full_data = data["data"]  # Full API response for sensors
+                async with self.session.request(
+                    method,
+                    self.base_url + path,
+                    headers=headers,
+                    data=payload,
+                    timeout=REQUEST_TIMEOUT,
+                    allow_redirects=False,
+                ) as response:
+                    body = await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                raise CSnetConnectionError(f"Error requesting {path}: {e}") from e
+            self.metrics.record_request(len(payload) if payload else 0, len(body))
+            self._record(method, path, response, payload, body, started)
+
+            if not self._is_session_expired(response, expect_json):
+                return response.status, body
+            if attempt:
+                self._set_state(STATE_DISCONNECTED)
+                raise CSnetAuthError(f"Session rejected by {path} right after login")
+            await self._reauthenticate(generation)
 
-                # Add mode_icon, class_name, and zone_name to each element
-                for element in data["data"]["elements"]:
-                    element["mode_icon"] = self._get_mode_icon(element["elementType"])
-                    element["class_name"] = self._get_class_name(element["elementType"])
-                    element["zone_name"] = self._get_zone_name(element["elementType"])
-
-                return data["data"]["elements"]
-            except json.JSONDecodeError as e:
-                _LOGGER.error("Failed to parse JSON: %s", e)
-                return {}
-
-        except Exception as e:
-            _LOGGER.error("Error fetching data from CSNet: %s", e)
-            return {}
-
-#aded might be not required
-    async def _get_element_data(self, room):
-        """Fetch element data for a specific room."""
+    async def update(self):
+        """Return the elements as an ElementIndex.
+
+        A response younger than ELEMENTS_CACHE_TTL is reused, and concurrent
+        callers share a single request. Raises CSnetAuthError if the
+        credentials are rejected and CSnetError for any other failure.
+        """
+        fetched_at = self._index_fetched_at
+        if fetched_at is not None and time.monotonic() - fetched_at < ELEMENTS_CACHE_TTL:
+            self.metrics.cache_hits += 1
+            return self._index
+        if self._update_task is None:
+            self._update_task = asyncio.create_task(self._fetch_elements(self._cache_generation))
+            self._update_task.add_done_callback(self._update_done)
+        else:
+            self.metrics.shared_fetches += 1
+        # A caller that times out must not cancel the fetch for the others
+        return await asyncio.shield(self._update_task)
+
+    def _update_done(self, task):
+        """Forget the finished fetch; its waiters already have the outcome."""
+        self._update_task = None
+        if not task.cancelled():
+            # Retrieve the error even when every waiter gave up on it
+            task.exception()
+
+    def invalidate_elements(self):
+        """Make the next update() fetch fresh elements, as after a write."""
+        self._index_fetched_at = None
+        self._cache_generation += 1
+
+    async def _fetch_elements(self, generation):
+        """Fetch and parse the elements."""
+        started = time.perf_counter()
+        status, body = await self._request("GET", ELEMENTS_PATH)
+
+        _LOGGER.debug("Fetching elements data. Response status: %s", status)
+        _LOGGER.debug("Response body: %s", _LogBody(body))
+
+        if status != 200:
+            error = CSnetError(f"Failed to fetch data. Status code: {status}")
+            self.metrics.record_failure(error)
+            raise error
+
+        parse_started = time.perf_counter()
+        try:
+            data = json_loads(body)["data"]
+            elements = [CSnetElement.from_dict(element) for element in data.pop("elements")]
+        except (ValueError, KeyError, TypeError) as e:
+            error = CSnetError(f"Failed to parse elements: {e}")
+            self.metrics.record_failure(error)
+            raise error from e
+        finished = time.perf_counter()
+        self.metrics.observe("parse", finished - parse_started)
+        self.metrics.observe("poll", finished - started)
+
+        self.last_full_data = data
+        # Index the elements so commands can classify zones without a fetch
+        self._index = ElementIndex(elements)
+        if generation == self._cache_generation:
+            self._index_fetched_at = time.monotonic()
+        # CSNet answers again; send what was written while it did not
+        self._schedule_replay()
+        return self._index
+
+    async def _get_element_data(self, parentId, room):
+        """Return the element for a room, fetching the elements if it is not known yet."""
+        element = self._index.get((parentId, room))
+        if element is not None:
+            return element
         try:
-            # Fetch the latest data from the API
-            data = await self.update()
-        
-            # Iterate through the list of elements to find the one matching the room
-            for element in data:
-                if element.get("elementType") == room:
-                    return element
-        
-            # If no matching element is found, return an empty dictionary
-            __init__LOGGER.warning(f"No element found for room {room}.")
-            return {}
+            # Fetch the latest data from the API, which refreshes the index
+            await self.update()
         except Exception as e:
             _LOGGER.error(f"Error fetching element data for room {room}: {e}")
-            return {}
+            return None
+
+        element = self._index.get((parentId, room))
+        if element is None:
+            _LOGGER.warning(f"No element found for room {room}.")
+        return element
 
     async def toggle(self, parentId, room, on, temp) -> None:
         """Send a toggle command to the device."""
-        await self.auth()  # Ensure authentication is done first
-
-        if not self.session:
-            _LOGGER.error("Session is not initialized. Cannot send toggle command.")
-            return
-
-        ts = round(time.time() * 1000)
-        try:
-            # Determine if this is a water heater or air heater command
-            is_water_heater = await self._is_water_heater(room)
-            # Prepare the base payload
-            data = {
-                "id": 29249,  # Example ID, adjust as needed
-                "updatedOn": ts,
-                "orderStatus": "PENDING",
-                "indoorId": parentId,
-                "_csrf": self.xsrf,
-            }
-
-            if is_water_heater:
-                # Water heater control
-                if on is not None:
-                    data["runStopDHW"] = on  # 1 for on, 0 for off
-                if temp is not None:
-#                    data["settingTempDHW"] = temp  # Always send the target temperature
-                    await self.set_water_heater_temperature(parentId, temp)  # Set water heater temperature
-                _LOGGER.debug(f"Sending toggle command with data: {data}")
-            else:
-                # Air heater control
-                data[f"runStopC{room}Air"] = on  # For climate (heating)
-                data[f"runStopC{room}Water"] = on  # For water heater
-                if temp is not None:
-                    data[f"settingTempRoomZ{room}"] = round(temp * 10)  # Temperature in tenths of a degree
-
-            _LOGGER.debug(f"Sending toggle command with data: {data}")  # Properly indented
-
-            # Send the request
-            response = await self.session.post(
-                "https://www.csnetmanager.com/data/indoor/heat_setting",
-                cookies={
-                    "SESSION": self.session.cookie_jar.filter_cookies("https://www.csnetmanager.com")["SESSION"].value,
-                    "XSRF-TOKEN": self.xsrf,
-                },
-                data=data,
-                timeout=5,
-            )
+        expected = {"on_off": on}
+        if temp is not None:
+            expected["setting_temperature"] = temp
+        order = self.orders.add((parentId, room), expected)
+        # Determine if this is a water heater or air heater command
+        is_water_heater = await self._is_water_heater(parentId, room)
+        fields = {}
+
+        if is_water_heater:
+            # Water heater control
+            if on is not None:
+                fields["runStopDHW"] = on  # 1 for on, 0 for off
+            if temp is not None:
+                fields["settingTempDHW"] = int(temp)  # Target temperature
+        else:
+            # Air heater control
+            fields[f"runStopC{room}Air"] = on  # For climate (heating)
+            fields[f"runStopC{room}Water"] = on  # For water heater
+            if temp is not None:
+                fields[f"settingTempRoomZ{room}"] = round(temp * 10)  # Temperature in tenths of a degree
 
-            _LOGGER.info(f"Toggle response status: {response.status}")
-            _LOGGER.info(f"Toggle response text: {await response.text()}")
-        except Exception as e:
-            _LOGGER.error(f"Error sending toggle command: {e}")
+        await self._submit_order(order, parentId, fields, "toggle")
 
     async def set_water_heater_state(self, parentId, on) -> None:
         """Set the on/off state of the water heater."""
-        await self.auth()  # Ensure authentication is done first
-
-        if not self.session:
-            _LOGGER.error("Session is not initialized. Cannot send on/off command.")
-            return
-
-        ts = round(time.time() * 1000)
-        try:
-            # Prepare the base payload
-            data = {
-                "id": 29249,  # Example ID, adjust as needed
-                "updatedOn": ts,
-                "orderStatus": "PENDING",
-                "indoorId": parentId,
-                "_csrf": self.xsrf,
-                "runStopDHW": on,  # 1 for on, 0 for off
-            }
-
-            _LOGGER.debug(f"Sending water heater on/off command with data: {data}")
-
-            # Send the request
-            response = await self.session.post(
-                "https://www.csnetmanager.com/data/indoor/heat_setting",
-                headers={
-                    "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
-                },
-                cookies={
-                    "SESSION": self.session.cookie_jar.filter_cookies("https://www.csnetmanager.com")["SESSION"].value,
-                    "XSRF-TOKEN": self.xsrf,
-                },
-                data=data,
-                timeout=5,
-            )
-
-            _LOGGER.info(f"Water heater on/off response status: {response.status}")
-            _LOGGER.info(f"Water heater on/off response text: {await response.text()}")
-        except Exception as e:
-            _LOGGER.error(f"Error sending water heater on/off command: {e}")
+        order = self.orders.add(self._water_heater_key(parentId), {"on_off": on})
+        await self._submit_order(order, parentId, {"runStopDHW": on}, "water heater on/off")  # 1 for on, 0 for off
 
     async def set_water_heater_temperature(self, parentId, temp, on) -> None:
         """Set the target temperature of the water heater."""
-        await self.auth()  # Ensure authentication is done first
+        order = self.orders.add(self._water_heater_key(parentId), {"on_off": on, "setting_temperature": int(temp)})
+        await self._submit_order(
+            order,
+            parentId,
+            {
+                "runStopDHW": on,  # Include the current state (1 for on, 0 for off)
+                "settingTempDHW": int(temp),  # Target temperature
+            },
+            "water heater temperature",
+        )
 
-        if not self.session:
-            _LOGGER.error("Session is not initialized. Cannot send temperature command.")
-            return
+    async def _submit_order(self, order, indoor_id, fields, label):
+        """Send the write of an order, settling the order if it cannot be sent.
 
-        ts = round(time.time() * 1000)
+        A write that was queued keeps its order outstanding, with the
+        deadline suspended until the replay lands; any other failure rejects
+        the order.
+        """
         try:
-            # Prepare the base payload
-            data = {
-                "id": 29249,  # Example ID, adjust as needed
-                "updatedOn": ts,
-                "orderStatus": "PENDING",
-                "indoorId": parentId,
-                "_csrf": self.xsrf,
-                "runStopDHW": on,  # Include the current state (1 for on, 0 for off)
-                "settingTempDHW": int(temp),  # Target temperature
-            }
+            await self._queue_command(indoor_id, fields)
+        except CSnetCommandQueued as e:
+            self.orders.hold(order)
+            _LOGGER.warning(f"Could not send {label} command: {e}")
+        except Exception as e:
+            _LOGGER.error(f"Error sending {label} command: {e}")
+            self.orders.reject(order)
+
+    def _water_heater_key(self, parentId):
+        """Return the element key of the hot water tank of an indoor unit."""
+        element = self._index.water_heater(parentId)
+        return element.key if element is not None else (parentId, 3)
+
+    async def _queue_command(self, indoor_id, fields):
+        """Merge `fields` into the pending write for an indoor unit and wait for it.
+
+        Commands for the same unit arriving within COMMAND_DEBOUNCE seconds are
+        sent as a single heat_setting request; a later value for a field
+        replaces an earlier one.
+        """
+        loop = asyncio.get_running_loop()
+        pending = self._pending_commands.get(indoor_id)
+        if pending is None:
+            pending = self._pending_commands[indoor_id] = _PendingCommand()
+            pending.handle = loop.call_later(COMMAND_DEBOUNCE, self._flush_command, indoor_id)
+        pending.fields.update(fields)
+        waiter = loop.create_future()
+        pending.waiters.append(waiter)
+        await waiter
+
+    def _flush_command(self, indoor_id):
+        """Send the merged write for an indoor unit once its debounce window ends."""
+        pending = self._pending_commands.pop(indoor_id)
+        self._command_tasks.add(task := asyncio.create_task(self._send_command(indoor_id, pending)))
+        task.add_done_callback(self._command_tasks.discard)
+
+    async def _send_command(self, indoor_id, pending):
+        """Post a merged heat_setting write and resolve every waiting caller.
+
+        A write that cannot reach CSNet is kept in the outbox and replayed
+        once CSNet answers again; its callers get CSnetCommandQueued.
+        """
+        _LOGGER.debug("Sending heat setting for %s merged from %d command(s)", indoor_id, len(pending.waiters))
+        try:
+            async with self._unit_lock(indoor_id):
+                await self._write(indoor_id, pending.fields)
+                # Still under the lock, so a replay cannot send an older value afterwards
+                self.outbox.discard(indoor_id, pending.fields)
+        except CSnetConnectionError as e:
+            error = e
+            if self.state != STATE_CLOSED:
+                self.outbox.add(indoor_id, pending.fields)
+                error = CSnetCommandQueued(f"CSNet unreachable, command queued: {e}")
+            self._resolve(pending.waiters, error)
+            return
+        except Exception as e:
+            self._resolve(pending.waiters, e)
+            return
+        self._resolve(pending.waiters)
+        self._schedule_replay()
+
+    @staticmethod
+    def _resolve(waiters, error=None):
+        """Complete the callers waiting for a write."""
+        for waiter in waiters:
+            if waiter.done():
+                continue
+            if error is None:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(error)
 
-            _LOGGER.debug(f"Sending water heater temperature command with data: {data}")
+    def _unit_lock(self, indoor_id):
+        """Return the lock that serializes the writes to an indoor unit.
 
-            # Send the request
-            response = await self.session.post(
-                "https://www.csnetmanager.com/data/indoor/heat_setting",
-                headers={
-                    "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
-                },
-                cookies={
-                    "SESSION": self.session.cookie_jar.filter_cookies("https://www.csnetmanager.com")["SESSION"].value,
-                    "XSRF-TOKEN": self.xsrf,
-                },
-                data=data,
-                timeout=5,
-            )
+        Writes to the same indoor unit are sent one at a time, in the order
+        they were flushed; other units proceed in parallel.
+        """
+        return self._unit_locks.setdefault(indoor_id, asyncio.Lock())
 
-            _LOGGER.info(f"Water heater temperature response status: {response.status}")
-            _LOGGER.info(f"Water heater temperature response text: {await response.text()}")
-        except Exception as e:
-            _LOGGER.error(f"Error sending water heater temperature command: {e}")
-
-    def _get_mode_icon(self, element_type):
-        """Get the mode icon based on the element type."""
-        if element_type == "air_heater" or element_type == 1:  # Handle both string and numeric values
-            return "ic_heat.svg"
-        elif element_type == "water_heater" or element_type == 3:  # Handle both string and numeric values
-            return "ic_dhw.svg"
-        else:
-            _LOGGER.warning(f"Unknown element type: {element_type}")
-            return "unknown.svg"
-
-    def _get_class_name(self, element_type):
-        """Get the class name based on the element type."""
-        if element_type == "air_heater" or element_type == 1:  # Handle both string and numeric values
-            return "unitCardHeat"
-        elif element_type == "water_heater" or element_type == 3:  # Handle both string and numeric values
-            return "unitCard"
-        else:
-            _LOGGER.warning(f"Unknown element type: {element_type}")
-            return "unknown"
+    async def _write(self, indoor_id, fields):
+        """Post a heat_setting write, raising CSnetError if it fails; hold the unit lock."""
+        try:
+            started = time.perf_counter()
+            status, body = await self._post_heat_setting(indoor_id, fields)
+        finally:
+            # Even a failed write may have reached the unit; don't serve old values
+            self.invalidate_elements()
+
+        _LOGGER.debug("Heat setting response status: %s", status)
+        _LOGGER.debug("Heat setting response body: %s", _LogBody(body))
+        self.metrics.observe("command", time.perf_counter() - started)
+        if status >= 400:
+            error = CSnetError(f"Heat setting rejected with status {status}")
+            self.metrics.record_failure(error)
+            raise error
+
+    async def _post_heat_setting(self, indoor_id, fields):
+        """Post the fields of a write for an indoor unit."""
+        data = {
+            "id": 29249,  # Example ID, adjust as needed
+            "updatedOn": round(time.time() * 1000),
+            "orderStatus": "PENDING",
+            "indoorId": indoor_id,
+            **fields,
+        }
+        _LOGGER.debug("Sending heat setting: %s", data)
+        return await self._request(
+            "POST",
+            HEAT_SETTING_PATH,
+            headers={
+                "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
+            },
+            data=data,
+            expect_json=False,
+        )
+
+    def _schedule_replay(self):
+        """Start replaying the outbox unless it is empty or already replaying."""
+        if not self.outbox or self._replay_task is not None or self.state == STATE_CLOSED:
+            return
+        self._replay_task = asyncio.create_task(self._replay_outbox())
+        self._replay_task.add_done_callback(self._replay_done)
+
+    def _replay_done(self, task):
+        """Forget the finished replay; a connection error leaves the rest queued."""
+        self._replay_task = None
+        if task.cancelled():
+            return
+        error = task.exception()
+        if isinstance(error, CSnetConnectionError):
+            _LOGGER.info("CSNet unreachable again, %d queued write(s) left: %s", len(self.outbox), error)
+        elif error is not None:
+            _LOGGER.error("Replaying queued commands failed: %s", error)
+
+    async def _replay_outbox(self):
+        """Send the queued writes in the order they were queued, one unit at a time.
+
+        Stops at the first write that still cannot reach CSNet, leaving it
+        and the rest queued for the next attempt.
+        """
+        while (indoor_id := self.outbox.next_unit()) is not None:
+            async with self._unit_lock(indoor_id):
+                # Taken under the lock: a live write delivered meanwhile has
+                # already dropped the values it replaced
+                commands = self.outbox.pop_unit(indoor_id)
+                if not commands:
+                    self.orders.release(indoor_id, delivered=False)
+                    continue
+                fields = {command.field: command.value for command in commands}
+                try:
+                    await self._write(indoor_id, fields)
+                except (CSnetConnectionError, asyncio.CancelledError):
+                    self.outbox.requeue(commands)
+                    raise
+                except CSnetError as e:
+                    self.outbox.record(indoor_id, fields, RESULT_FAILED, str(e))
+                    self.orders.release(indoor_id, delivered=False)
+                else:
+                    self.outbox.record(indoor_id, fields, RESULT_SENT)
+                    self.orders.release(indoor_id, delivered=True)
 
-    async def _is_water_heater(self, room):
+    async def _is_water_heater(self, parentId, room):
         """Determine if the given room is a water heater."""
-        element = await self._get_element_data(room)
-        if not element:
+        element = await self._get_element_data(parentId, room)
+        if element is None:
             return False  # If no element data is found, assume it's not a water heater
-
-        # Check if the zone_name contains "Hot Water"
-        return "Hot Water" in element.get("zone_name", "")
-#        return (
-#            element.get("mode_icon") == "ic_dhw.svg"
-#            or "unitCard" in element.get("class_name", "")
-#            or "Hot Water" in element.get("zone_name", "")
-#        )
-        _LOGGER.debug(f"Checking if room {room} is a water heater: {element}")
-
-    def _get_zone_name(self, element_type):
-        """Get the zone name based on the element type."""
-        if element_type == "air_heater" or element_type == 1:  # Handle both string and numeric values
-            return "Room"
-        elif element_type == "water_heater" or element_type == 3:  # Handle both string and numeric values
-            return "Hot Water Tank"
-        else:
-            _LOGGER.warning(f"Unknown element type: {element_type}")
-            return "Unknown"
+        return element.kind == KIND_WATER_HEATER
 
     async def close(self):
         """Close the session."""
+        for pending in self._pending_commands.values():
+            pending.handle.cancel()
+            for waiter in pending.waiters:
+                if not waiter.done():
+                    waiter.set_exception(CSnetConnectionError("Hub closed before the command was sent"))
+        self._pending_commands.clear()
+        self._set_state(STATE_CLOSED)
+        if self._replay_task is not None:
+            self._replay_task.cancel()
         if self.session:
             _LOGGER.debug("Closing session.")
             await self.session.close()
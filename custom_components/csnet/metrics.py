@@ -0,0 +1,93 @@
+# metrics.py
+from bisect import bisect_left
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LatencyHistogram:
+    """Counts observed durations into fixed buckets."""
+
+    __slots__ = ("count", "total", "last", "buckets")
+
+    def __init__(self) -> None:
+        """Initialize an empty histogram."""
+        self.count = 0
+        self.total = 0.0
+        self.last = None
+        # One slot per bucket plus one for slower observations
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def observe(self, seconds):
+        """Record one duration."""
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    @property
+    def mean(self):
+        """Return the mean duration, or None before the first observation."""
+        return self.total / self.count if self.count else None
+
+    def as_dict(self):
+        """Return the histogram in a JSON-serialisable form."""
+        bounds = [*map(str, LATENCY_BUCKETS), "+Inf"]
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "last": self.last,
+            "buckets": dict(zip(bounds, self.buckets)),
+        }
+
+
+class HubMetrics:
+    """Request, traffic and failure counters of a CSnetHub."""
+
+    def __init__(self) -> None:
+        """Initialize zeroed metrics."""
+        self.latency = {
+            "login": LatencyHistogram(),
+            "poll": LatencyHistogram(),
+            "command": LatencyHistogram(),
+            "parse": LatencyHistogram(),
+        }
+        self.requests = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.failures = {}
+        # update() calls answered from the elements cache or a shared fetch
+        self.cache_hits = 0
+        self.shared_fetches = 0
+
+    def observe(self, kind, seconds):
+        """Record the duration of a login, poll, command or parse."""
+        self.latency[kind].observe(seconds)
+
+    def record_request(self, sent, received):
+        """Count one HTTP exchange and its body sizes."""
+        self.requests += 1
+        self.bytes_out += sent
+        self.bytes_in += received
+
+    def record_failure(self, error):
+        """Count a failure under the name of its exception class."""
+        name = type(error).__name__
+        self.failures[name] = self.failures.get(name, 0) + 1
+
+    @property
+    def logins(self):
+        """Return the number of successful logins."""
+        return self.latency["login"].count
+
+    def as_dict(self):
+        """Return all metrics in a JSON-serialisable form."""
+        return {
+            "requests": self.requests,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "failures": dict(self.failures),
+            "cache_hits": self.cache_hits,
+            "shared_fetches": self.shared_fetches,
+            "latency": {kind: histogram.as_dict() for kind, histogram in self.latency.items()},
+        }
@@ -0,0 +1,102 @@
+"""Typed model of the elements returned by CSNet."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+KIND_CLIMATE = "climate"
+KIND_WATER_HEATER = "water_heater"
+KIND_UNKNOWN = "unknown"
+
+# elementType -> entity kind; the numeric circuit types match runStopC{n}Air
+ELEMENT_KINDS = {
+    1: KIND_CLIMATE,
+    2: KIND_CLIMATE,
+    3: KIND_WATER_HEATER,
+    "air_heater": KIND_CLIMATE,
+    "water_heater": KIND_WATER_HEATER,
+}
+
+_warned_types: set = set()
+
+
+@dataclass(slots=True)
+class CSnetElement:
+    """The fields of a CSNet element used by the platforms."""
+
+    element_type: int | str
+    parent_id: int
+    kind: str
+    current_temperature: float | None
+    setting_temperature: float | None
+    on_off: int | None
+
+    @property
+    def key(self):
+        """Return the (parentId, elementType) identity of the element."""
+        return (self.parent_id, self.element_type)
+
+    @classmethod
+    def from_dict(cls, element: dict) -> CSnetElement:
+        """Build an element from one entry of the /data/elements response."""
+        element_type = element["elementType"]
+        kind = ELEMENT_KINDS.get(element_type)
+        if kind is None:
+            kind = KIND_UNKNOWN
+            if element_type not in _warned_types:
+                _warned_types.add(element_type)
+                _LOGGER.warning("Unknown element type: %s", element_type)
+        return cls(
+            element_type,
+            element["parentId"],
+            kind,
+            element.get("currentTemperature"),
+            element.get("settingTemperature"),
+            element.get("onOff"),
+        )
+
+
+class ElementIndex:
+    """The elements of one poll, keyed by identity and indexed by unit and kind.
+
+    `elements` maps (parentId, elementType) to the element; parentId is the
+    account-wide id of the indoor unit, so zones of several units (or
+    installations) never collide.
+    """
+
+    __slots__ = ("elements", "by_unit", "by_kind")
+
+    def __init__(self, elements=()) -> None:
+        """Index `elements`."""
+        self.elements = {}
+        self.by_unit = {}
+        self.by_kind = {}
+        for element in elements:
+            key = element.key
+            if key in self.elements:
+                _LOGGER.warning("Duplicate element %s in the CSNet response", key)
+                continue
+            self.elements[key] = element
+            self.by_unit.setdefault(element.parent_id, {})[element.element_type] = element
+            self.by_kind.setdefault(element.kind, []).append(element)
+
+    def __len__(self) -> int:
+        """Return the number of elements."""
+        return len(self.elements)
+
+    def get(self, key):
+        """Return the element with identity `key`, or None."""
+        return self.elements.get(key)
+
+    def of_kind(self, kind):
+        """Return the elements of an entity kind."""
+        return self.by_kind.get(kind, ())
+
+    def water_heater(self, parent_id):
+        """Return the hot water tank of an indoor unit, or None."""
+        for element in self.by_unit.get(parent_id, {}).values():
+            if element.kind == KIND_WATER_HEATER:
+                return element
+        return None
@@ -0,0 +1,138 @@
+# orders.py
+import logging
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+ORDER_PENDING = "pending"
+ORDER_CONFIRMED = "confirmed"
+ORDER_TIMED_OUT = "timed_out"
+ORDER_REJECTED = "rejected"
+ORDER_SUPERSEDED = "superseded"
+
+# Seconds the heat pump gets to report the values of a write
+ORDER_TIMEOUT = 120
+
+
+class CSnetOrder:
+    """A heat_setting write waiting to show up in the polled elements."""
+
+    __slots__ = ("key", "expected", "deadline", "status")
+
+    def __init__(self, key, expected, deadline) -> None:
+        """Initialize the order."""
+        self.key = key
+        self.expected = expected
+        # None while the write waits in the outbox for CSNet to be reachable
+        self.deadline = deadline
+        self.status = ORDER_PENDING
+
+    @property
+    def failed(self):
+        """Return True if the write did not take effect."""
+        return self.status in (ORDER_TIMED_OUT, ORDER_REJECTED)
+
+    def __repr__(self):
+        """Return a readable representation for logging."""
+        return f"CSnetOrder({self.key}, {self.expected}, {self.status})"
+
+
+class OrderTracker:
+    """Tracks outstanding writes per element, keyed by (parentId, elementType)."""
+
+    def __init__(self, timeout=ORDER_TIMEOUT) -> None:
+        """Initialize the tracker."""
+        self.timeout = timeout
+        self._orders = {}
+        # Called with the order whenever one is added or finishes
+        self._listeners = []
+
+    @property
+    def has_pending(self):
+        """Return True while any write is unconfirmed."""
+        return bool(self._orders)
+
+    def add_listener(self, listener):
+        """Call `listener` with every order that is added or finishes; returns a remover."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def pending(self, key):
+        """Return the outstanding order for an element, if any."""
+        return self._orders.get(key)
+
+    def add(self, key, expected):
+        """Record a write expecting `expected` field values on element `key`."""
+        previous = self._orders.get(key)
+        if previous is not None:
+            # The new write carries the latest intent for the element
+            previous.status = ORDER_SUPERSEDED
+            expected = {**previous.expected, **expected}
+        order = self._orders[key] = CSnetOrder(key, expected, time.monotonic() + self.timeout)
+        self._notify(order)
+        return order
+
+    def reject(self, order):
+        """Mark an order whose write was refused or never sent."""
+        if order.status != ORDER_PENDING:
+            return
+        order.status = ORDER_REJECTED
+        self._orders.pop(order.key, None)
+        _LOGGER.warning("Write to %s was rejected: %s", order.key, order.expected)
+        self._notify(order)
+
+    def hold(self, order):
+        """Suspend the deadline of an order whose write was queued until CSNet is reachable."""
+        if order.status == ORDER_PENDING:
+            order.deadline = None
+
+    def release(self, indoor_id, delivered):
+        """Restart the deadlines of the held orders of an indoor unit, or reject them.
+
+        Called once the queued write of the unit was sent (`delivered`), or
+        failed or expired instead.
+        """
+        held = [order for order in self._orders.values() if order.deadline is None and order.key[0] == indoor_id]
+        for order in held:
+            if delivered:
+                order.deadline = time.monotonic() + self.timeout
+            else:
+                self.reject(order)
+
+    def match(self, elements):
+        """Confirm or expire outstanding orders against freshly polled elements.
+
+        `elements` maps element keys to the polled elements. Returns the orders that finished with this poll.
+        """
+        if not self._orders:
+            return []
+        now = time.monotonic()
+        finished = []
+        for key, order in list(self._orders.items()):
+            element = elements.get(key)
+            if element is not None and all(
+                _same_value(getattr(element, field), value) for field, value in order.expected.items()
+            ):
+                order.status = ORDER_CONFIRMED
+            elif order.deadline is not None and now >= order.deadline:
+                order.status = ORDER_TIMED_OUT
+                _LOGGER.warning("Write to %s was not applied in time: %s", key, order.expected)
+            else:
+                continue
+            del self._orders[key]
+            finished.append(order)
+        for order in finished:
+            self._notify(order)
+        return finished
+
+    def _notify(self, order):
+        for listener in list(self._listeners):
+            listener(order)
+
+
+def _same_value(current, expected):
+    """Compare an element value with an expected one, tolerating float rounding."""
+    try:
+        return abs(float(current) - float(expected)) < 0.05
+    except (TypeError, ValueError):
+        return current == expected
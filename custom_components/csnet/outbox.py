@@ -0,0 +1,163 @@
+# outbox.py
+from collections import deque
+from datetime import datetime, timezone
+import logging
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+# Seconds a write that could not be sent stays worth sending
+OUTBOX_TTL = 4 * 3600
+# Finished queued commands kept for diagnostics
+RESULTS_KEPT = 20
+
+RESULT_SENT = "sent"
+RESULT_FAILED = "failed"
+RESULT_EXPIRED = "expired"
+
+
+class QueuedCommand:
+    """The latest value written to one field of an indoor unit."""
+
+    __slots__ = ("indoor_id", "field", "value", "queued_at", "expires_at")
+
+    def __init__(self, indoor_id, field, value, queued_at, expires_at) -> None:
+        """Initialize a queued command."""
+        self.indoor_id = indoor_id
+        self.field = field
+        self.value = value
+        self.queued_at = queued_at
+        self.expires_at = expires_at
+
+    def as_dict(self):
+        """Return the command in a JSON-serialisable form."""
+        return {
+            "indoor_id": self.indoor_id,
+            "field": self.field,
+            "value": self.value,
+            "queued_at": self.queued_at,
+            "expires_at": self.expires_at,
+        }
+
+
+class CommandOutbox:
+    """Writes that failed to reach CSNet, kept until they can be replayed.
+
+    Only the latest value per indoor unit and field is kept, in the order
+    the values were queued. Commands older than their TTL are dropped
+    instead of replayed. Listeners are called after every change with the
+    result of a finished command, or None, so the outbox can be persisted
+    and the results published.
+    """
+
+    def __init__(self, ttl=OUTBOX_TTL) -> None:
+        """Initialize an empty outbox."""
+        self.ttl = ttl
+        # (indoor_id, field) -> QueuedCommand, oldest first
+        self._commands = {}
+        self.results = deque(maxlen=RESULTS_KEPT)
+        self._listeners = []
+
+    def __len__(self) -> int:
+        """Return the number of queued field writes."""
+        return len(self._commands)
+
+    def add_listener(self, listener):
+        """Call `listener(result)` after every change; returns a remover."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def add(self, indoor_id, fields, queued_at=None):
+        """Queue the fields of a write, replacing older values of the same fields."""
+        queued_at = queued_at or time.time()
+        changed = False
+        for field, value in fields.items():
+            key = (indoor_id, field)
+            current = self._commands.get(key)
+            if current is not None and current.queued_at > queued_at:
+                # A newer command for this field is already waiting
+                continue
+            self._commands.pop(key, None)
+            self._commands[key] = QueuedCommand(indoor_id, field, value, queued_at, queued_at + self.ttl)
+            changed = True
+        if changed:
+            _LOGGER.info("Queued write to %s until CSNet is reachable: %s", indoor_id, fields)
+            self._notify(None)
+
+    def requeue(self, commands):
+        """Put commands taken by pop_unit() back in front, unless newer values replaced them."""
+        returned = {}
+        for command in commands:
+            key = (command.indoor_id, command.field)
+            if key not in self._commands:
+                returned[key] = command
+        if returned:
+            self._commands = {**returned, **self._commands}
+            self._notify(None)
+
+    def discard(self, indoor_id, fields):
+        """Drop queued values superseded by a write that was delivered."""
+        removed = [self._commands.pop((indoor_id, field), None) for field in fields]
+        if any(removed):
+            self._notify(None)
+
+    def next_unit(self):
+        """Return the indoor unit of the oldest queued value, or None."""
+        if not self._commands:
+            return None
+        return next(iter(self._commands.values())).indoor_id
+
+    def pop_unit(self, indoor_id, now=None):
+        """Remove and return the queued commands of an indoor unit that are still due.
+
+        Expired values are dropped and reported instead.
+        """
+        now = now or time.time()
+        commands = [command for command in self._commands.values() if command.indoor_id == indoor_id]
+        for command in commands:
+            del self._commands[(indoor_id, command.field)]
+        live = [command for command in commands if command.expires_at > now]
+        expired = [command for command in commands if command.expires_at <= now]
+        if expired:
+            self.record(indoor_id, {command.field: command.value for command in expired}, RESULT_EXPIRED)
+        elif commands:
+            self._notify(None)
+        return live
+
+    def record(self, indoor_id, fields, status, error=None):
+        """Keep and publish the result of a queued write."""
+        result = {
+            "indoor_id": indoor_id,
+            "fields": fields,
+            "status": status,
+            "error": error,
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+        }
+        self.results.append(result)
+        if status == RESULT_SENT:
+            _LOGGER.info("Replayed queued write to %s: %s", indoor_id, fields)
+        else:
+            _LOGGER.warning("Queued write to %s %s: %s %s", indoor_id, status, fields, error or "")
+        self._notify(result)
+
+    def as_dict(self):
+        """Return the queued commands and recent results for persistence."""
+        return {
+            "commands": [command.as_dict() for command in self._commands.values()],
+            "results": list(self.results),
+        }
+
+    def restore(self, data):
+        """Load persisted commands and results, keeping newer values already queued."""
+        if not data:
+            return
+        for command in data.get("commands", []):
+            key = (command["indoor_id"], command["field"])
+            current = self._commands.get(key)
+            if current is None or current.queued_at < command["queued_at"]:
+                self._commands[key] = QueuedCommand(**command)
+        self.results.extend(data.get("results", []))
+
+    def _notify(self, result):
+        for listener in list(self._listeners):
+            listener(result)
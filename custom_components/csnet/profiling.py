@@ -0,0 +1,119 @@
+# profiling.py
+import asyncio
+import cProfile
+import io
+import pstats
+import tracemalloc
+
+# Functions listed per section of the summary
+SUMMARY_LINES = 25
+# Only these modules are listed in the integration sections of the summary
+SUMMARY_FILTER = r"csnet[/\\](hub|coordinator)\.py"
+
+
+class Profiler:
+    """Profiles the next refreshes of coordinators and writes of their hubs.
+
+    Attaching wraps `_async_update_data` of each coordinator and `_write` of
+    each hub on the instance; detaching removes the wrappers again, so
+    nothing is checked or measured while no profile runs. cProfile is only
+    enabled while at least one wrapped call is in flight, which includes
+    whatever else the event loop runs during its awaits.
+    """
+
+    def __init__(self, calls, memory=False) -> None:
+        """Initialize a profiler that stops after `calls` refreshes and writes."""
+        self.calls = calls
+        self.memory = memory
+        self.refreshes = 0
+        self.commands = 0
+        self.done = asyncio.get_running_loop().create_future()
+        self._profile = cProfile.Profile()
+        self._active = 0
+        self._attached = []
+        self._started_tracemalloc = False
+        self._snapshot = None
+
+    def attach(self, coordinators):
+        """Start profiling the coordinators and their (possibly shared) hubs."""
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        hubs = {id(coordinator.hub): coordinator.hub for coordinator in coordinators}
+        for coordinator in coordinators:
+            self._wrap(coordinator, "_async_update_data", "refreshes")
+        for hub in hubs.values():
+            self._wrap(hub, "_write", "commands")
+
+    def _wrap(self, owner, name, counter):
+        method = getattr(owner, name)
+
+        async def profiled(*args, **kwargs):
+            self._enter()
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                setattr(self, counter, getattr(self, counter) + 1)
+                self._leave()
+
+        setattr(owner, name, profiled)
+        self._attached.append((owner, name))
+
+    def _enter(self):
+        if not self._active:
+            self._profile.enable()
+        self._active += 1
+
+    def _leave(self):
+        if self.done.done():
+            # A call that was in flight when the profile finished
+            return
+        self._active -= 1
+        if not self._active:
+            self._profile.disable()
+        if self.refreshes + self.commands >= self.calls:
+            self.detach()
+
+    def detach(self):
+        """Stop profiling, remove the wrappers and resolve `done`."""
+        if self.done.done():
+            return
+        for owner, name in self._attached:
+            # The class attribute shows through again
+            delattr(owner, name)
+        self._attached.clear()
+        if self._active:
+            self._profile.disable()
+            self._active = 0
+        if self._started_tracemalloc:
+            self._snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        elif self.memory and tracemalloc.is_tracing():
+            self._snapshot = tracemalloc.take_snapshot()
+        self.done.set_result(None)
+
+    def write(self, base_path):
+        """Write the raw stats to `base_path`.prof and a summary to `base_path`.txt.
+
+        Blocking; run it in the executor. Returns the summary path, or None
+        if no call was profiled.
+        """
+        if not self.refreshes + self.commands:
+            return None
+        self._profile.dump_stats(f"{base_path}.prof")
+        out = io.StringIO()
+        out.write(f"Profiled {self.refreshes} refresh(es) and {self.commands} command(s)\n\n")
+        stats = pstats.Stats(self._profile, stream=out)
+        for sort in ("tottime", "cumulative"):
+            out.write(f"=== hub.py / coordinator.py by {sort} ===\n")
+            stats.sort_stats(sort).print_stats(SUMMARY_FILTER, SUMMARY_LINES)
+        out.write("=== All functions by cumulative time ===\n")
+        stats.sort_stats("cumulative").print_stats(SUMMARY_LINES)
+        if self._snapshot is not None:
+            out.write("=== Allocations by line ===\n")
+            for statistic in self._snapshot.statistics("lineno")[:SUMMARY_LINES]:
+                out.write(f"{statistic}\n")
+        with open(f"{base_path}.txt", "w", encoding="utf-8") as summary:
+            summary.write(out.getvalue())
+        return f"{base_path}.txt"
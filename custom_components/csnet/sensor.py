@@ -1,78 +1,286 @@
+from collections.abc import Callable
+from dataclasses import dataclass
 import logging
-from homeassistant.components.sensor import SensorEntity
-from homeassistant.const import UnitOfTemperature
+from typing import Any
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.const import EntityCategory, UnitOfInformation, UnitOfTemperature, UnitOfTime
+from homeassistant.core import callback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import DOMAIN
+from .models import KIND_CLIMATE, KIND_WATER_HEATER
+from .statistics import STATISTICS_DEADBAND, HourlyStatistics
 
 _LOGGER = logging.getLogger(__name__)
 
-class OutdoorTemperatureSensor(CoordinatorEntity, SensorEntity):
-    """Representation of the outdoor temperature sensor."""
 
-    def __init__(self, coordinator, name):
+@dataclass(frozen=True, kw_only=True)
+class CSnetSensorDescription(SensorEntityDescription):
+    """Describes a numeric field of the /data/elements response.
+
+    For installation fields `path` is the chain of keys into the response
+    data; for element fields it is the CSnetElement attribute, and `kinds`
+    lists the element kinds that carry it. `scale` converts the raw value
+    into the native unit.
+    """
+
+    path: tuple[str, ...]
+    kinds: tuple[str, ...] = ()
+    scale: float = 1
+
+    def read(self, source):
+        """Return the scaled value of the field in `source`, or None."""
+        value = source
+        for part in self.path:
+            if value is None:
+                return None
+            value = value.get(part) if isinstance(value, dict) else getattr(value, part, None)
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return None
+        return value * self.scale if self.scale != 1 else value
+
+
+def _temperature(key, name, path, kinds=()):
+    """Return the description of a Celsius temperature field."""
+    return CSnetSensorDescription(
+        key=key,
+        name=name,
+        path=path,
+        kinds=kinds,
+        device_class=SensorDeviceClass.TEMPERATURE,
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+    )
+
+
+# Fields of the response data outside the elements list
+INSTALLATION_SENSORS: tuple[CSnetSensorDescription, ...] = (
+    _temperature("outdoor_temperature", "Outdoor temperature", ("avOuTemp",)),
+    _temperature("weather_temperature", "Weather temperature", ("weatherTemperature",)),
+)
+
+# Fields of each element, by the kind of element that carries them
+ELEMENT_SENSORS: tuple[CSnetSensorDescription, ...] = (
+    _temperature("temperature", "Temperature", ("current_temperature",), (KIND_CLIMATE,)),
+    _temperature("setpoint", "Setpoint", ("setting_temperature",), (KIND_CLIMATE,)),
+    _temperature("tank_temperature", "Tank temperature", ("current_temperature",), (KIND_WATER_HEATER,)),
+    _temperature("tank_setpoint", "Tank setpoint", ("setting_temperature",), (KIND_WATER_HEATER,)),
+)
+
+
+@dataclass(frozen=True, kw_only=True)
+class CSnetDiagnosticSensorDescription(SensorEntityDescription):
+    """Describes a sensor reporting what the integration costs."""
+
+    value_fn: Callable[[Any], Any]
+
+
+def _last_ms(histogram):
+    """Return the last observed duration in milliseconds."""
+    return round(histogram.last * 1000) if histogram.last is not None else None
+
+
+DIAGNOSTIC_SENSORS: tuple[CSnetDiagnosticSensorDescription, ...] = (
+    CSnetDiagnosticSensorDescription(
+        key="poll_interval",
+        name="Poll interval",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        value_fn=lambda coordinator: coordinator.update_interval.total_seconds(),
+    ),
+    CSnetDiagnosticSensorDescription(
+        key="last_refresh",
+        name="Last successful refresh",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        value_fn=lambda coordinator: coordinator.last_update_success_time,
+    ),
+    CSnetDiagnosticSensorDescription(
+        key="poll_latency",
+        name="Poll latency",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        value_fn=lambda coordinator: _last_ms(coordinator.hub.metrics.latency["poll"]),
+    ),
+    CSnetDiagnosticSensorDescription(
+        key="command_latency",
+        name="Command latency",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        value_fn=lambda coordinator: _last_ms(coordinator.hub.metrics.latency["command"]),
+    ),
+    CSnetDiagnosticSensorDescription(
+        key="logins",
+        name="Logins",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: coordinator.hub.metrics.logins,
+    ),
+    CSnetDiagnosticSensorDescription(
+        key="requests",
+        name="Requests",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: coordinator.hub.metrics.requests,
+    ),
+    CSnetDiagnosticSensorDescription(
+        key="failures",
+        name="Request failures",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: sum(coordinator.hub.metrics.failures.values()),
+    ),
+    CSnetDiagnosticSensorDescription(
+        key="bytes_in",
+        name="Data received",
+        device_class=SensorDeviceClass.DATA_SIZE,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: coordinator.hub.metrics.bytes_in,
+    ),
+    CSnetDiagnosticSensorDescription(
+        key="queued_commands",
+        name="Queued commands",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda coordinator: len(coordinator.hub.outbox),
+    ),
+)
+
+
+class CSnetDiagnosticSensor(CoordinatorEntity, SensorEntity):
+    """Diagnostic sensor fed from the hub and coordinator metrics."""
+
+    entity_description: CSnetDiagnosticSensorDescription
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    # Opt-in: enable the ones you want to chart from the entity settings
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(self, coordinator, entry_id, description: CSnetDiagnosticSensorDescription) -> None:
         """Initialize the sensor."""
         super().__init__(coordinator)
-        self._name = name
-        self._state = None
+        self.entity_description = description
+        self._attr_name = f"CSNet {description.name}"
+        self._attr_unique_id = f"{entry_id}_{description.key}"
 
     @property
-    def name(self):
-        """Return the name of the sensor."""
-        return f"{self._name} Outdoor Temperature"
+    def native_value(self):
+        """Return the current value of the metric."""
+        return self.entity_description.value_fn(self.coordinator)
 
     @property
-    def state(self):
-        """Return the state of the sensor."""
-        return self._state
+    def available(self) -> bool:
+        """Keep reporting while the cloud is failing; that is when it matters."""
+        return True
 
-    @property
-    def unit_of_measurement(self):
-        """Return the unit of measurement."""
-        return UnitOfTemperature.CELSIUS
-
-    async def async_update(self):
-        """Fetch the outdoor temperature from the coordinator."""
-        # Access the coordinator's data
-        coordinator_data = self.coordinator.data
-
-        # Extract temperature safely
-        if "avOuTemp" in coordinator_data:
-            self._state = coordinator_data["avOuTemp"]
-        else:
-            _LOGGER.warning("Outdoor temperature (avOuTemp) not found in coordinator data.")
 
-async def async_setup_entry(hass, config_entry, async_add_entities):
-    """Set up the CSNet sensor platform."""
-    _LOGGER.debug("Setting up CSNet sensor platform.")
-    
-    # Get the coordinator from Home Assistant's stored data
-    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+class CSnetFieldSensor(CoordinatorEntity, SensorEntity):
+    """Sensor for one registry field, updated from the coordinator refresh."""
 
-    # Fetch full data
-    full_data = coordinator.hub.last_full_data if hasattr(coordinator.hub, "last_full_data") else {}
+    entity_description: CSnetSensorDescription
+    _attr_state_class = SensorStateClass.MEASUREMENT
 
-    # Store full data separately in coordinator (without modifying elements)
-    coordinator.full_data = full_data
+    def __init__(
+        self, coordinator, entry_id, name, unique_id, description: CSnetSensorDescription, idx=None
+    ) -> None:
+        """Initialize the sensor; `idx` is the element key of element fields."""
+        super().__init__(coordinator, context=idx)
+        self.entity_description = description
+        self.idx = idx
+        self._attr_name = f"{name} {description.name}"
+        self._attr_unique_id = unique_id
+        self._statistics = coordinator.statistics
+        if self._statistics is not None:
+            # History comes from the hourly statistics; without a state class
+            # the recorder does not compile its own from every state row
+            self._attr_state_class = None
+            self._statistic_id = HourlyStatistics.statistic_id(entry_id, *(idx or ()), description.key)
+        # Last state written to Home Assistant, to skip identical writes
+        self._written_state = None
 
-    # Create and add the outdoor temperature sensor
-    if "avOuTemp" in full_data:
-        _LOGGER.debug("✅ Found avOuTemp in data. Adding sensor.")
-        async_add_entities([OutdoorTemperatureSensor(coordinator, "CSNet")])
-    else:
-        _LOGGER.warning("❌ avOuTemp not found in data. Sensor will not be created.")
+    async def async_added_to_hass(self) -> None:
+        """Populate the state from the current coordinator data."""
+        await super().async_added_to_hass()
+        self._handle_coordinator_update()
 
+    @property
+    def available(self) -> bool:
+        """Return True if the field is known and the data within the staleness budget."""
+        return self.coordinator.data_available and self._attr_native_value is not None
 
-async def async_update(self):
-    """Force the hub to refresh data and update the sensor."""
-    await self.coordinator.async_request_refresh()  # 🔄 Force data refresh
+    @property
+    def extra_state_attributes(self):
+        """Flag values from the startup snapshot or from before a failed refresh."""
+        attributes = {}
+        if self.coordinator.restored:
+            attributes["restored"] = True
+        if self.coordinator.stale:
+            attributes["stale"] = True
+            attributes["last_success"] = self.coordinator.last_update_success_time
+        return attributes or None
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Read the field from the refreshed data and write it if it changed."""
+        if self.idx is None:
+            source = self.coordinator.installation
+        else:
+            source = self.coordinator.data.get(self.idx)
+        value = self._attr_native_value = self.entity_description.read(source)
+        state = (self.available, value, self.coordinator.restored, self.coordinator.stale)
+        if self._statistics is not None and not self.coordinator.restored:
+            self._statistics.observe(
+                self._statistic_id,
+                self.name,
+                self.native_unit_of_measurement,
+                # Held values of an outage are not measurements
+                value if self.available and not self.coordinator.stale else None,
+            )
+            if not self._significant_change(state):
+                return
+        if state != self._written_state:
+            self._written_state = state
+            self.async_write_ha_state()
+
+    def _significant_change(self, state):
+        """Return True if the state moved enough to be recorded."""
+        if self._written_state is None:
+            return True
+        available, value, *flags = state
+        written_available, written_value, *written_flags = self._written_state
+        if (available, flags) != (written_available, written_flags) or None in (value, written_value):
+            return True
+        return abs(value - written_value) >= STATISTICS_DEADBAND
 
-    full_data = self.coordinator.hub.last_full_data if hasattr(self.coordinator.hub, "last_full_data") else {}
 
-    _LOGGER.debug(f"✅ Full data in sensor after forced refresh: {full_data}")
+async def async_setup_entry(hass, config_entry, async_add_entities):
+    """Set up the CSNet sensor platform."""
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    entry_id = config_entry.entry_id
+
+    entities = [
+        CSnetDiagnosticSensor(coordinator, entry_id, description)
+        for description in DIAGNOSTIC_SENSORS
+    ]
+    # Only fields the installation actually reports get an entity
+    entities.extend(
+        CSnetFieldSensor(coordinator, entry_id, "CSNet", f"{entry_id}_{description.key}", description)
+        for description in INSTALLATION_SENSORS
+        if description.read(coordinator.installation) is not None
+    )
+    for element in coordinator.index.elements.values():
+        parent_id, element_type = element.key
+        entities.extend(
+            CSnetFieldSensor(
+                coordinator,
+                entry_id,
+                coordinator.element_name(element),
+                f"hitachi_pump_{parent_id}_{element_type}_{description.key}",
+                description,
+                element.key,
+            )
+            for description in ELEMENT_SENSORS
+            if element.kind in description.kinds and description.read(element) is not None
+        )
 
-    if "avOuTemp" in full_data:
-        self._state = float(full_data["avOuTemp"])
-        _LOGGER.debug(f"✅ Outdoor temperature updated: {self._state}°C")
-    else:
-        _LOGGER.warning("❌ ERROR: Outdoor temperature (avOuTemp) not found in API response.")
+    async_add_entities(entities)
@@ -0,0 +1,126 @@
+# services.py
+import asyncio
+import json
+import logging
+
+import voluptuous as vol
+
+from homeassistant.components import persistent_notification
+from homeassistant.core import HomeAssistant, ServiceCall, SupportsResponse, callback
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .const import DATA_PROFILER, DOMAIN
+from .coordinator import CSnetCoordinator
+from .profiling import Profiler
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_PROFILE = "profile"
+SERVICE_DUMP_METRICS = "dump_metrics"
+
+ATTR_CALLS = "calls"
+ATTR_MEMORY = "memory"
+ATTR_TIMEOUT = "timeout"
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CALLS, default=10): vol.All(vol.Coerce(int), vol.Range(min=1, max=1000)),
+        vol.Optional(ATTR_MEMORY, default=False): cv.boolean,
+        vol.Optional(ATTR_TIMEOUT, default=600): vol.All(vol.Coerce(int), vol.Range(min=10, max=86400)),
+    }
+)
+
+
+def _coordinators(hass: HomeAssistant):
+    """Return the coordinators of the loaded config entries by entry ID."""
+    return {key: value for key, value in hass.data.get(DOMAIN, {}).items() if isinstance(value, CSnetCoordinator)}
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the services of the integration, once for all config entries."""
+    if hass.services.has_service(DOMAIN, SERVICE_PROFILE):
+        return
+
+    async def async_profile(call: ServiceCall) -> None:
+        """Profile the next refreshes and commands in the background."""
+        if hass.data[DOMAIN].get(DATA_PROFILER) is not None:
+            raise HomeAssistantError("A CSNet profile is already running")
+        coordinators = _coordinators(hass)
+        if not coordinators:
+            raise HomeAssistantError("No CSNet installation is loaded")
+        profiler = hass.data[DOMAIN][DATA_PROFILER] = Profiler(call.data[ATTR_CALLS], call.data[ATTR_MEMORY])
+        profiler.attach(coordinators.values())
+        _LOGGER.warning("Profiling the next %d CSNet refreshes and commands", profiler.calls)
+        hass.async_create_background_task(
+            _async_finish_profile(hass, profiler, call.data[ATTR_TIMEOUT]), "csnet profile"
+        )
+
+    async def async_dump_metrics(call: ServiceCall):
+        """Write the counters of every installation to the configuration directory."""
+        metrics = {entry_id: _metrics(coordinator) for entry_id, coordinator in _coordinators(hass).items()}
+        path = hass.config.path(f"csnet_metrics.{dt_util.utcnow():%Y%m%d%H%M%S}.json")
+        await hass.async_add_executor_job(_write_json, path, metrics)
+        _LOGGER.warning("CSNet metrics written to %s", path)
+        return metrics
+
+    hass.services.async_register(DOMAIN, SERVICE_PROFILE, async_profile, schema=PROFILE_SCHEMA)
+    hass.services.async_register(
+        DOMAIN, SERVICE_DUMP_METRICS, async_dump_metrics, supports_response=SupportsResponse.OPTIONAL
+    )
+
+
+@callback
+def async_unload_services(hass: HomeAssistant) -> None:
+    """Remove the services and stop a running profile once no entry is left."""
+    if _coordinators(hass):
+        return
+    if (profiler := hass.data.get(DOMAIN, {}).pop(DATA_PROFILER, None)) is not None:
+        profiler.detach()
+    hass.services.async_remove(DOMAIN, SERVICE_PROFILE)
+    hass.services.async_remove(DOMAIN, SERVICE_DUMP_METRICS)
+
+
+async def _async_finish_profile(hass: HomeAssistant, profiler: Profiler, timeout: int) -> None:
+    """Wait for the profiled calls, or the timeout, and write the results."""
+    try:
+        await asyncio.wait_for(asyncio.shield(profiler.done), timeout)
+    except asyncio.TimeoutError:
+        _LOGGER.warning(
+            "CSNet profile timed out after %d of %d calls", profiler.refreshes + profiler.commands, profiler.calls
+        )
+    finally:
+        profiler.detach()
+        if hass.data.get(DOMAIN, {}).get(DATA_PROFILER) is profiler:
+            del hass.data[DOMAIN][DATA_PROFILER]
+    base_path = hass.config.path(f"csnet_profile.{dt_util.utcnow():%Y%m%d%H%M%S}")
+    summary = await hass.async_add_executor_job(profiler.write, base_path)
+    if summary is None:
+        message = "No CSNet refresh or command ran while profiling."
+    else:
+        message = (
+            f"Profiled {profiler.refreshes} refresh(es) and {profiler.commands} command(s). "
+            f"The summary is in {summary}, the raw stats in {base_path}.prof."
+        )
+    persistent_notification.async_create(hass, message, title="CSNet profile", notification_id="csnet_profile")
+
+
+def _metrics(coordinator: CSnetCoordinator):
+    """Return the counters of one installation."""
+    hub = coordinator.hub
+    return {
+        "connection": hub.state,
+        "circuit": hub.breaker.state,
+        "last_update_success": coordinator.last_update_success,
+        "poll_interval": coordinator.update_interval.total_seconds(),
+        "queued_commands": len(hub.outbox),
+        "metrics": hub.metrics.as_dict(),
+    }
+
+
+def _write_json(path, data):
+    """Write `data` to `path` as indented JSON."""
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=2, default=str)
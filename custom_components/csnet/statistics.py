@@ -0,0 +1,225 @@
+# statistics.py
+from datetime import timedelta
+import logging
+
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import async_add_external_statistics
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_track_utc_time_change
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+HOUR = timedelta(hours=1)
+
+# Smallest change (in the native unit) worth a state write in statistics mode
+STATISTICS_DEADBAND = 0.5
+
+
+class _Series:
+    """Time-weighted mean, minimum and maximum of one reading within an hour."""
+
+    __slots__ = ("name", "unit", "value", "since", "weighted", "duration", "low", "high")
+
+    def __init__(self, name, unit) -> None:
+        """Initialize a series without readings."""
+        self.name = name
+        self.unit = unit
+        self.value = None
+        self.since = None
+        self.weighted = 0.0
+        self.duration = 0.0
+        self.low = None
+        self.high = None
+
+    def advance(self, until):
+        """Account for the current value having held until `until`."""
+        if self.value is not None:
+            seconds = (until - self.since).total_seconds()
+            if seconds > 0:
+                self.weighted += self.value * seconds
+                self.duration += seconds
+        self.since = until
+
+    def set(self, value, now):
+        """Record a new reading; None marks the reading as unavailable."""
+        self.advance(now)
+        self.value = value
+        if value is not None:
+            self.low = value if self.low is None else min(self.low, value)
+            self.high = value if self.high is None else max(self.high, value)
+
+    def row(self, start):
+        """Return the statistics row of the hour starting at `start` so far, or None."""
+        if not self.duration:
+            return None
+        return StatisticData(start=start, mean=self.weighted / self.duration, min=self.low, max=self.high)
+
+    def close(self, end):
+        """Return the statistics row of the hour ending at `end`, or None."""
+        self.advance(end)
+        row = self.row(end - HOUR)
+        self.weighted = 0.0
+        self.duration = 0.0
+        # The value carried into the next hour bounds it from the start
+        self.low = self.high = self.value
+        return row
+
+    def as_dict(self):
+        """Return the series in a JSON-serialisable form."""
+        return {
+            "name": self.name,
+            "unit": self.unit,
+            "since": self.since.isoformat() if self.since else None,
+            "weighted": self.weighted,
+            "duration": self.duration,
+            "low": self.low,
+            "high": self.high,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Return a series saved by as_dict(), without a current value."""
+        series = cls(data["name"], data["unit"])
+        series.since = dt_util.parse_datetime(data["since"]) if data["since"] else None
+        series.weighted = data["weighted"]
+        series.duration = data["duration"]
+        series.low = data["low"]
+        series.high = data["high"]
+        return series
+
+
+class HourlyStatistics:
+    """Aggregates readings in memory and imports them as hourly statistics.
+
+    Readings are folded into a time-weighted mean, a minimum and a maximum
+    per hour. When an hour ends its rows are written to the recorder as
+    external statistics in one batch per statistic, instead of the recorder
+    storing a state row for every poll.
+
+    When the entry unloads or Home Assistant stops, the hour in progress is
+    imported as a partial row and saved to `store`; the next start continues
+    it and clears the store, so a restart or reload does not lose it. The
+    time in between counts as unavailable.
+    """
+
+    def __init__(self, hass, store=None) -> None:
+        """Initialize the aggregator."""
+        self.hass = hass
+        self._store = store
+        self._series = {}
+        # Closed hours not yet handed to the recorder, per statistic id
+        self._rows = {}
+        self._unsub_hour = None
+        self._unsub_stop = None
+
+    @staticmethod
+    def statistic_id(*parts):
+        """Return a valid external statistic id made of `parts`."""
+        object_id = "_".join(str(part).lower() for part in parts)
+        return f"{DOMAIN}:{object_id}"
+
+    @callback
+    def async_start(self):
+        """Close every hour as it ends, and save the hour in progress when Home Assistant stops."""
+        self._unsub_hour = async_track_utc_time_change(self.hass, self._async_hour_ended, minute=0, second=0)
+        self._unsub_stop = self.hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, self._async_home_assistant_stop)
+
+    async def async_stop(self, now=None):
+        """Stop closing hours and save the hour in progress; used when the entry unloads."""
+        if self._unsub_stop is not None:
+            self._unsub_stop()
+            self._unsub_stop = None
+        data = self._async_stop_hours(now)
+        if self._store is not None:
+            # Awaited, so the setup after a reload restores it
+            await self._store.async_save(data)
+
+    @callback
+    def _async_home_assistant_stop(self, event):
+        """Save the hour in progress; the store writes it at Home Assistant's final write."""
+        # A listener registered with async_listen_once is gone once it fired
+        self._unsub_stop = None
+        data = self._async_stop_hours()
+        if self._store is not None:
+            self._store.async_delay_save(lambda: data)
+
+    @callback
+    def _async_stop_hours(self, now=None):
+        """Stop closing hours and import the hour in progress; returns its data for the store."""
+        if self._unsub_hour is not None:
+            self._unsub_hour()
+            self._unsub_hour = None
+        return self.async_save_open_hour(now)
+
+    async def async_restore(self, now=None):
+        """Continue the hour saved by the last stop, or import it if it has ended."""
+        data = await self._store.async_load() if self._store is not None else None
+        if not data:
+            return
+        hour = (now or dt_util.utcnow()).replace(minute=0, second=0, microsecond=0)
+        for statistic_id, saved in data["series"].items():
+            series = self._series[statistic_id] = _Series.from_dict(saved)
+            if series.since is not None and series.since < hour:
+                # Stopped in an earlier hour: that hour ends with what was saved
+                end = series.since.replace(minute=0, second=0, microsecond=0) + HOUR
+                if (row := series.close(end)) is not None:
+                    self._rows.setdefault(statistic_id, []).append(row)
+        self.async_flush()
+        # Restoring the same hours again would overwrite the rows of later saves
+        await self._store.async_remove()
+
+    @callback
+    def async_save_open_hour(self, now=None):
+        """Import the hour in progress as a partial row; returns its data for the store."""
+        now = now or dt_util.utcnow()
+        start = now.replace(minute=0, second=0, microsecond=0)
+        for statistic_id, series in self._series.items():
+            # Nothing is known about the time until the next start
+            series.set(None, now)
+            if (row := series.row(start)) is not None:
+                self._rows.setdefault(statistic_id, []).append(row)
+        self.async_flush()
+        return {"series": {statistic_id: series.as_dict() for statistic_id, series in self._series.items()}}
+
+    @callback
+    def observe(self, statistic_id, name, unit, value, now=None):
+        """Record the current value of a reading."""
+        series = self._series.get(statistic_id)
+        if series is None:
+            series = self._series[statistic_id] = _Series(name, unit)
+        series.set(value, now or dt_util.utcnow())
+
+    @callback
+    def _async_hour_ended(self, now):
+        """Close the hour that just ended and write it."""
+        self.close_hour(dt_util.utcnow().replace(minute=0, second=0, microsecond=0))
+        self.async_flush()
+
+    def close_hour(self, end):
+        """Turn the readings of the hour ending at `end` into rows."""
+        for statistic_id, series in self._series.items():
+            row = series.close(end)
+            if row is not None:
+                self._rows.setdefault(statistic_id, []).append(row)
+
+    @callback
+    def async_flush(self):
+        """Hand the closed hours to the recorder, one batch per statistic."""
+        rows, self._rows = self._rows, {}
+        for statistic_id, statistics in rows.items():
+            series = self._series[statistic_id]
+            metadata = StatisticMetaData(
+                has_mean=True,
+                has_sum=False,
+                name=series.name,
+                source=DOMAIN,
+                statistic_id=statistic_id,
+                unit_of_measurement=series.unit,
+            )
+            async_add_external_statistics(self.hass, metadata, statistics)
+        if rows:
+            _LOGGER.debug("Imported hourly statistics for %d readings", len(rows))
@@ -1,26 +1,23 @@
 # water_heater.py
 from homeassistant.components.water_heater import WaterHeaterEntity, WaterHeaterEntityFeature
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.const import UnitOfTemperature
 from homeassistant.core import callback
 import logging
 
-from .const import DOMAIN, ELEMENT_PREFIX  # Add this import
+from .const import DOMAIN
+from .entity import CSnetEntity
+from .models import KIND_WATER_HEATER
 
 _LOGGER = logging.getLogger(__name__)
 
-class WaterHeater(CoordinatorEntity, WaterHeaterEntity):
+class WaterHeater(CSnetEntity, WaterHeaterEntity):
     """Representation of a water heater entity."""
 
     def __init__(self, coordinator, name, idx, parentId) -> None:
         """Initialize the water heater."""
-        super().__init__(coordinator, context=idx)
+        super().__init__(coordinator, parentId, idx)
         self._name = name
-        self._parentId = parentId
-        self._attr_unique_id = f"hitachi_pump_water_{name}"
-        self.idx = idx
-        self.coordinator = coordinator
-        self.hub = coordinator.hub
+        self._attr_unique_id = f"hitachi_pump_water_{parentId}_{idx}"
         self._attr_temperature_unit = UnitOfTemperature.CELSIUS
         self._attr_operation_list = ["off", "heat"]  # Supported operation modes
         self._attr_current_operation = "off"  # Default operation mode
@@ -36,17 +33,22 @@ class WaterHeater(CoordinatorEntity, WaterHeaterEntity):
         """Return the name of the water heater."""
         return self._name
 
+    @property
+    def _visible_state(self):
+        """Return the values of the entity shown in Home Assistant."""
+        return (self._attr_current_temperature, self._attr_current_operation, self._attr_target_temperature)
+
     async def async_set_operation_mode(self, operation_mode: str) -> None:
         """Set the operation mode of the water heater."""
         _LOGGER.debug(f"Setting operation mode to {operation_mode} for {self._name}")
         try:
             if operation_mode == "off":
                 self._attr_current_operation = "off"
-                self.async_write_ha_state()
+                self._async_write_state_if_changed()
                 await self.hub.set_water_heater_state(self._parentId, 0)  # Turn off
             elif operation_mode == "heat":
                 self._attr_current_operation = "heat"
-                self.async_write_ha_state()
+                self._async_write_state_if_changed()
                 await self.hub.set_water_heater_state(self._parentId, 1)  # Turn on
         except Exception as e:
             _LOGGER.error(f"Error setting operation mode: {e}")
@@ -59,7 +61,7 @@ class WaterHeater(CoordinatorEntity, WaterHeaterEntity):
             if temperature is not None:
                 self._attr_target_temperature = temperature
                 self._attr_current_operation = "heat" if self._attr_current_operation == "heat" else "off"
-                self.async_write_ha_state()
+                self._async_write_state_if_changed()
                 await self.hub.set_water_heater_temperature(
                     self._parentId, temperature,  1 if self._attr_current_operation == "heat" else 0
                 )
@@ -69,32 +71,30 @@ class WaterHeater(CoordinatorEntity, WaterHeaterEntity):
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
-        if self.idx in self.coordinator.data:
-            self._attr_current_temperature = self.coordinator.data[self.idx]["currentTemperature"]
-            self._attr_current_operation = "off" if self.coordinator.data[self.idx]["onOff"] == 0 else "heat"
-            self.async_write_ha_state()
+        element = self.coordinator.data.get(self._key)
+        if element is not None:
+            self._attr_current_temperature = element.current_temperature
+            # Keep the optimistic state until the pending write is confirmed or fails
+            if self.hub.orders.pending(self._key) is None:
+                self._attr_current_operation = "off" if element.on_off == 0 else "heat"
+                if element.setting_temperature is not None:
+                    self._attr_target_temperature = element.setting_temperature
+            self._async_write_state_if_changed()
         else:
-            _LOGGER.error(f"Element with idx {self.idx} not found in coordinator data.")
+            _LOGGER.error(f"Element {self._key} not found in coordinator data.")
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Set up the water heater platform."""
     coordinator = hass.data[DOMAIN][config_entry.entry_id]
-    elements = coordinator.data
 
     entities = []
-    for key, element in elements.items():
-        mode_icon = element.get("mode_icon", "")
-        class_name = element.get("class_name", "")
-        zone_name = element.get("zone_name", "")
-
-        # Check if the element is a water heater
-        if "Hot Water" in zone_name:
-            entity = WaterHeater(
-                coordinator,
-                ELEMENT_PREFIX + str(key),  # Use the key as the unique identifier
-                element["elementType"],     # Pass the element type
-                element["parentId"],        # Pass the parent ID
-            )
-            entities.append(entity)
+    for element in coordinator.index.of_kind(KIND_WATER_HEATER):
+        entity = WaterHeater(
+            coordinator,
+            coordinator.element_name(element),
+            element.element_type,       # Pass the element type
+            element.parent_id,          # Pass the parent ID
+        )
+        entities.append(entity)
 
     async_add_entities(entities)
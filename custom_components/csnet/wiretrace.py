@@ -0,0 +1,139 @@
+# wiretrace.py
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import json
+import logging
+import os
+import re
+import time
+from urllib.parse import parse_qsl, urlencode
+
+_LOGGER = logging.getLogger(__name__)
+
+# JSON string values whose key looks like a credential or session token
+REDACT_PATTERN = re.compile(
+    rb'("[^"]*(?:password|user|mail|token|csrf|session|xsrf)[^"]*"\s*:\s*)"[^"]*"', re.IGNORECASE
+)
+# Token assignments in HTML and scripts, such as "XSRF-TOKEN=...;"
+TOKEN_ASSIGNMENT_PATTERN = re.compile(rb"((?:XSRF-TOKEN|SESSION|_csrf)=)[^;&\s\"'<>]+", re.IGNORECASE)
+# Values of hidden inputs and meta tags named like a token, in either attribute order
+TOKEN_ATTRIBUTE_PATTERNS = (
+    re.compile(
+        rb"""(<(?:input|meta)\b[^>]*?\bname\s*=\s*["'][^"']*(?:csrf|xsrf|token)[^"']*["'][^>]*?"""
+        rb"""\b(?:value|content)\s*=\s*["'])[^"']*""",
+        re.IGNORECASE,
+    ),
+    re.compile(
+        rb"""(<(?:input|meta)\b[^>]*?\b(?:value|content)\s*=\s*["'])[^"']*"""
+        rb"""(?=["'][^>]*?\bname\s*=\s*["'][^"']*(?:csrf|xsrf|token))""",
+        re.IGNORECASE,
+    ),
+)
+# Form fields never written to a trace
+REDACT_FIELDS = {"username", "password", "password_unsanitized", "token", "_csrf"}
+REDACTED = "***"
+
+# Compressed bytes of the trace file before it is rotated
+TRACE_MAX_BYTES = 5 * 1024 * 1024
+TRACE_BACKUPS = 3
+# Seconds to collect exchanges before a batch is written
+TRACE_FLUSH_DELAY = 5.0
+
+
+def redact_body(body: bytes) -> bytes:
+    """Return a response body with credential-like JSON values and HTML tokens masked."""
+    redacted = REDACTED.encode()
+    body = REDACT_PATTERN.sub(rb'\1"' + redacted + rb'"', body)
+    body = TOKEN_ASSIGNMENT_PATTERN.sub(rb"\1" + redacted, body)
+    for pattern in TOKEN_ATTRIBUTE_PATTERNS:
+        body = pattern.sub(rb"\1" + redacted, body)
+    return body
+
+
+def redact_form(form: str) -> str:
+    """Return a urlencoded form with the credential fields masked."""
+    return urlencode(
+        [(key, REDACTED if key in REDACT_FIELDS else value) for key, value in parse_qsl(form, keep_blank_values=True)],
+        safe="*",
+    )
+
+
+class WireRecorder:
+    """Writes redacted request/response pairs of a CSnetHub to a trace file.
+
+    Exchanges are buffered on the event loop and appended in batches, as
+    gzip members of a JSON-lines file, by a single worker thread. The file
+    is rotated to `.1`, `.2`, ... once it grows past `max_bytes`. Only the
+    method, path, status, redirect target, content type, duration and the
+    redacted bodies are kept; cookies and headers never are.
+    """
+
+    def __init__(self, path, max_bytes=TRACE_MAX_BYTES, backups=TRACE_BACKUPS) -> None:
+        """Initialize the recorder writing to `path`."""
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._buffer = []
+        self._flush_handle = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="csnet_wiretrace")
+
+    def record(self, method, path, status, location, content_type, elapsed, sent, received):
+        """Queue one exchange; `sent` is the urlencoded form or None."""
+        self._buffer.append(
+            {
+                "time": time.time(),
+                "method": method,
+                "path": path,
+                "status": status,
+                "location": location,
+                "content_type": content_type,
+                "elapsed": round(elapsed, 4),
+                "request": redact_form(sent) if sent else None,
+                "response": redact_body(received).decode("utf-8", "replace"),
+            }
+        )
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(TRACE_FLUSH_DELAY, self.flush)
+
+    def flush(self):
+        """Hand the buffered exchanges to the writer thread."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._buffer = self._buffer, []
+        if batch:
+            return self._executor.submit(self._write, batch)
+        return None
+
+    def close(self):
+        """Write what is buffered and stop the writer thread without waiting."""
+        self.flush()
+        self._executor.shutdown(wait=False)
+
+    def _write(self, batch):
+        """Append a batch to the trace file, rotating it first if it is full."""
+        try:
+            if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+                self._rotate()
+            lines = "".join(json.dumps(entry, separators=(",", ":")) + "\n" for entry in batch)
+            with gzip.open(self.path, "at", encoding="utf-8") as trace:
+                trace.write(lines)
+        except OSError as err:
+            _LOGGER.warning("Could not write the CSNet wire trace: %s", err)
+
+    def _rotate(self):
+        """Shift the trace files by one and drop the oldest."""
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+
+def read_trace(path):
+    """Yield the exchanges of a trace file in recording order."""
+    with gzip.open(path, "rt", encoding="utf-8") as trace:
+        for line in trace:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1 @@
+"""Tests for the csnet integration."""
@@ -0,0 +1,51 @@
+"""Fixtures shared by the csnet tests.
+
+The hub talks to benchmarks.fake_csnet, the local stand-in for the
+csnetmanager.com endpoints, so the tests exercise the real HTTP exchanges.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+
+from benchmarks.fake_csnet import PASSWORD, USERNAME, FakeCSnet
+from custom_components.csnet import hub as hub_module
+from custom_components.csnet.hub import CSnetHub
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    """Keep the GET retry backoff short."""
+    monkeypatch.setattr(hub_module, "RETRY_BASE_DELAY", 0.01)
+
+
+@pytest.fixture
+async def server():
+    """Return a running stand-in server with two indoor units."""
+    server = FakeCSnet(units=2)
+    await server.start()
+    yield server
+    await server.stop()
+
+
+@pytest.fixture
+async def hub(server):
+    """Return a hub pointed at the stand-in server."""
+    hub = CSnetHub(USERNAME, PASSWORD, base_url=server.url)
+    yield hub
+    await hub.close()
+
+
+@pytest.fixture
+async def hass(tmp_path):
+    """Return a bare Home Assistant instance with its config in a temporary directory."""
+    hass = HomeAssistant(str(tmp_path))
+    yield hass
+    await hass.async_stop(force=True)
+
+
+@pytest.fixture
+def entry():
+    """Return the part of a config entry the platforms read."""
+    return SimpleNamespace(entry_id="entry")
@@ -0,0 +1,33 @@
+"""Tests for the heat_setting writes of CSnetHub."""
+import asyncio
+
+WATER_HEATER_UNIT = 1000
+
+
+async def test_rapid_commands_are_sent_as_one_write(server, hub):
+    """Commands within the debounce window become one POST with the last value."""
+    await hub.update()
+
+    await asyncio.gather(
+        *(hub.set_water_heater_temperature(WATER_HEATER_UNIT, 40 + step, 1) for step in range(10))
+    )
+
+    assert server.requests["POST /data/indoor/heat_setting"] == 1
+    assert len(server.writes) == 1
+    assert server.writes[0]["indoorId"] == str(WATER_HEATER_UNIT)
+    assert server.writes[0]["settingTempDHW"] == "49"
+
+
+async def test_commands_for_different_units_are_not_merged(server, hub):
+    """Each indoor unit gets its own write."""
+    await hub.update()
+
+    await asyncio.gather(
+        hub.set_water_heater_temperature(1000, 45, 1),
+        hub.set_water_heater_temperature(1001, 50, 1),
+    )
+
+    assert sorted((write["indoorId"], write["settingTempDHW"]) for write in server.writes) == [
+        ("1000", "45"),
+        ("1001", "50"),
+    ]
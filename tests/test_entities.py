@@ -0,0 +1,71 @@
+"""Tests for the climate and water heater entities."""
+from datetime import timedelta
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.csnet import climate, water_heater
+from custom_components.csnet.const import DOMAIN
+from custom_components.csnet.coordinator import CSnetCoordinator
+
+
+async def _listening_entities(hass, coordinator, entry):
+    """Create the entities and subscribe them like CoordinatorEntity does, counting state writes."""
+    hass.data[DOMAIN] = {entry.entry_id: coordinator}
+    entities = []
+    for platform in (climate, water_heater):
+        await platform.async_setup_entry(hass, entry, entities.extend)
+    writes = []
+    for entity in entities:
+        entity.async_write_ha_state = lambda entity=entity: writes.append(entity.coordinator_context)
+        coordinator.async_add_listener(entity._handle_coordinator_update, entity.coordinator_context)
+    return entities, writes
+
+
+async def test_only_changed_elements_write_state(hass, server, hub, entry):
+    """A poll wakes only the entities of changed elements, not for a new poll interval."""
+    coordinator = CSnetCoordinator(hass, hub)
+    await coordinator.async_refresh()
+    entities, writes = await _listening_entities(hass, coordinator, entry)
+    for entity in entities:
+        entity._handle_coordinator_update()
+    writes.clear()
+
+    hub.invalidate_elements()
+    await coordinator.async_refresh()
+    assert writes == []
+
+    server.elements[0]["currentTemperature"] += 1.5
+    hub.invalidate_elements()
+    await coordinator.async_refresh()
+    changed = (server.elements[0]["parentId"], server.elements[0]["elementType"])
+    assert writes == [changed]
+    assert all("poll_interval" not in entity.extra_state_attributes for entity in entities)
+    await coordinator.async_shutdown()
+
+
+async def test_entities_stay_available_within_the_stale_budget(hass, server, hub, entry):
+    """Failed polls keep the last good data until the budget is spent, then mark it unavailable."""
+    coordinator = CSnetCoordinator(hass, hub, stale_budget=60)
+    await coordinator.async_refresh()
+    entities, writes = await _listening_entities(hass, coordinator, entry)
+    for entity in entities:
+        entity._handle_coordinator_update()
+    server.available = False
+
+    hub.invalidate_elements()
+    await coordinator.async_refresh()
+    assert not coordinator.last_update_success
+    assert all(entity.available for entity in entities)
+    assert all(entity.extra_state_attributes["stale"] for entity in entities)
+
+    # Just within the budget, then past it
+    coordinator.last_update_success_time = dt_util.utcnow() - timedelta(seconds=59)
+    await coordinator.async_refresh()
+    assert all(entity.available for entity in entities)
+
+    coordinator.last_update_success_time = dt_util.utcnow() - timedelta(seconds=61)
+    writes.clear()
+    await coordinator.async_refresh()
+    assert not any(entity.available for entity in entities)
+    assert sorted(writes) == sorted(entity.coordinator_context for entity in entities)
+    await coordinator.async_shutdown()
@@ -0,0 +1,145 @@
+"""Tests for the commands queued while CSNet is unreachable and their replay."""
+import asyncio
+
+from custom_components.csnet.orders import ORDER_CONFIRMED, ORDER_PENDING, ORDER_REJECTED
+from custom_components.csnet.outbox import RESULT_EXPIRED, RESULT_SENT, CommandOutbox
+
+WATER_HEATER_UNIT = 1000
+WATER_HEATER_KEY = (WATER_HEATER_UNIT, 3)
+
+
+async def _reconnect(server, hub):
+    """Bring the server back and wait for the replay a successful poll starts."""
+    server.available = True
+    index = await hub.update()
+    if hub._replay_task is not None:
+        await asyncio.gather(hub._replay_task, return_exceptions=True)
+    return index
+
+
+async def test_write_is_queued_while_down_and_replayed(server, hub):
+    """A write that cannot reach CSNet is kept and sent once a poll succeeds."""
+    await hub.update()
+    server.available = False
+
+    await hub.set_water_heater_temperature(WATER_HEATER_UNIT, 45, 1)
+
+    assert len(hub.outbox) == 2
+    assert server.writes == []
+
+    await _reconnect(server, hub)
+
+    assert len(server.writes) == 1
+    assert server.writes[0]["settingTempDHW"] == "45"
+    assert len(hub.outbox) == 0
+    assert hub.outbox.results[-1]["status"] == RESULT_SENT
+
+
+async def test_last_queued_value_wins(server, hub):
+    """Only the latest value of a field is replayed."""
+    await hub.update()
+    server.available = False
+
+    for temp in (45, 47, 43):
+        await hub.set_water_heater_temperature(WATER_HEATER_UNIT, temp, 1)
+
+    assert len(hub.outbox) == 2
+
+    await _reconnect(server, hub)
+
+    assert [write["settingTempDHW"] for write in server.writes] == ["43"]
+
+
+async def test_replay_keeps_the_queueing_order(server, hub):
+    """Units are replayed in the order their writes were queued."""
+    await hub.update()
+    server.available = False
+
+    await hub.set_water_heater_temperature(1001, 44, 1)
+    await hub.set_water_heater_temperature(1000, 46, 1)
+
+    await _reconnect(server, hub)
+
+    assert [(write["indoorId"], write["settingTempDHW"]) for write in server.writes] == [
+        ("1001", "44"),
+        ("1000", "46"),
+    ]
+
+
+async def test_expired_write_is_dropped_and_its_order_rejected(server, hub):
+    """A write older than the outbox TTL is reported instead of replayed."""
+    await hub.update()
+    hub.outbox.ttl = 0.05
+    server.available = False
+
+    await hub.set_water_heater_temperature(WATER_HEATER_UNIT, 45, 1)
+    order = hub.orders.pending(WATER_HEATER_KEY)
+    await asyncio.sleep(0.1)
+    await _reconnect(server, hub)
+
+    assert server.writes == []
+    assert len(hub.outbox) == 0
+    assert hub.outbox.results[-1]["status"] == RESULT_EXPIRED
+    assert order.status == ORDER_REJECTED
+
+
+async def test_restored_outbox_is_replayed(server, hub):
+    """Queued writes survive a restart through the persisted outbox."""
+    await hub.update()
+    server.available = False
+    await hub.set_water_heater_temperature(WATER_HEATER_UNIT, 45, 1)
+    data = hub.outbox.as_dict()
+
+    restored = CommandOutbox()
+    restored.restore(data)
+    assert restored.as_dict() == data
+
+    hub.outbox = restored
+    await _reconnect(server, hub)
+
+    assert [write["settingTempDHW"] for write in server.writes] == ["45"]
+    assert len(restored) == 0
+
+
+async def test_replay_does_not_overwrite_a_newer_live_write(server, hub):
+    """A live write in flight when the replay starts leaves its value in place."""
+    await hub.update()
+    server.available = False
+    await hub.set_water_heater_temperature(WATER_HEATER_UNIT, 40, 1)
+
+    server.available = True
+    server.write_latency = 0.2
+    live = asyncio.create_task(hub.set_water_heater_temperature(WATER_HEATER_UNIT, 60, 1))
+    while not hub._unit_lock(WATER_HEATER_UNIT).locked():
+        await asyncio.sleep(0.01)
+    # The poll starts the replay while the live POST is still on the wire
+    await hub.update()
+    replay = hub._replay_task
+    await live
+    if replay is not None:
+        await replay
+
+    assert [write["settingTempDHW"] for write in server.writes] == ["60"]
+    assert len(hub.outbox) == 0
+
+
+async def test_queued_order_outlives_the_order_timeout(server, hub):
+    """A queued write's order waits for the replay instead of timing out."""
+    index = await hub.update()
+    hub.orders.timeout = 0.05
+    server.available = False
+
+    await hub.set_water_heater_temperature(WATER_HEATER_UNIT, 45, 1)
+    order = hub.orders.pending(WATER_HEATER_KEY)
+    await asyncio.sleep(0.1)
+
+    # A poll that still shows the old value does not give up on the order
+    assert hub.orders.match(index.elements) == []
+    assert order.status == ORDER_PENDING
+
+    await _reconnect(server, hub)
+    hub.invalidate_elements()
+    index = await hub.update()
+
+    assert hub.orders.match(index.elements) == [order]
+    assert order.status == ORDER_CONFIRMED
@@ -0,0 +1,40 @@
+"""Tests for the shared and cached elements fetch of CSnetHub.update()."""
+import asyncio
+
+ELEMENTS = "GET /data/elements"
+
+
+async def test_concurrent_updates_share_one_request(server, hub):
+    """A burst of update() calls sends a single elements GET."""
+    server.latency = 0.05
+
+    indexes = await asyncio.gather(*(hub.update() for _ in range(20)))
+
+    assert server.requests[ELEMENTS] == 1
+    assert all(index is indexes[0] for index in indexes)
+    assert hub.metrics.shared_fetches == 19
+
+
+async def test_recent_elements_are_reused_until_invalidated(server, hub):
+    """Within the cache TTL update() answers from memory; invalidate_elements() forces a fetch."""
+    first = await hub.update()
+    assert await hub.update() is first
+    assert server.requests[ELEMENTS] == 1
+    assert hub.metrics.cache_hits == 1
+
+    hub.invalidate_elements()
+    await hub.update()
+    assert server.requests[ELEMENTS] == 2
+
+
+async def test_invalidation_during_a_fetch_is_not_cached_over(server, hub):
+    """A fetch that started before a write does not count as fresh afterwards."""
+    server.latency = 0.05
+    fetch = asyncio.create_task(hub.update())
+    await asyncio.sleep(0.01)
+
+    hub.invalidate_elements()
+    await fetch
+    await hub.update()
+
+    assert server.requests[ELEMENTS] == 2
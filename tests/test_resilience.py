@@ -0,0 +1,175 @@
+"""Tests for the retries, the circuit breaker and how failures reach Home Assistant."""
+import asyncio
+
+import aiohttp
+from aiohttp import web
+import pytest
+
+from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from benchmarks.fake_csnet import USERNAME
+from custom_components.csnet import hub as hub_module
+from custom_components.csnet.breaker import STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN, CircuitBreaker
+from custom_components.csnet.coordinator import CSnetCoordinator
+from custom_components.csnet.hub import GET_RETRIES, CSnetAuthError, CSnetConnectionError, CSnetHub
+
+ELEMENTS = "GET /data/elements"
+HEAT_SETTING = "POST /data/indoor/heat_setting"
+
+
+@pytest.mark.parametrize("fault", ["error_rate", "reset_rate"])
+async def test_get_is_retried_on_5xx_and_resets(server, hub, fault):
+    """A failing GET is sent 1 + GET_RETRIES times before it fails."""
+    setattr(server, fault, 1.0)
+
+    with pytest.raises(CSnetConnectionError):
+        await hub.update()
+
+    assert server.requests[ELEMENTS] == 1 + GET_RETRIES
+    assert hub.breaker.failures == 1
+
+
+async def test_get_is_retried_on_timeouts(server, hub, monkeypatch):
+    """A GET that times out is retried like one that failed."""
+    await hub.auth()
+    monkeypatch.setattr(hub_module, "REQUEST_TIMEOUT", aiohttp.ClientTimeout(total=0.05))
+    server.latency = 0.2
+
+    with pytest.raises(CSnetConnectionError):
+        await hub.update()
+
+    assert server.requests[ELEMENTS] == 1 + GET_RETRIES
+
+
+async def test_get_recovers_within_its_retries(server, hub):
+    """A GET that fails once and then succeeds returns the elements."""
+    await hub.auth()
+    server.error_rate = 1.0
+    task = asyncio.create_task(hub.update())
+    while server.requests.get(ELEMENTS, 0) < 1:
+        await asyncio.sleep(0.001)
+    server.error_rate = 0.0
+
+    index = await task
+
+    assert len(index) == len(server.elements)
+    assert hub.breaker.failures == 0
+
+
+async def test_post_is_not_retried(server, hub):
+    """A failing heat_setting write is sent once."""
+    await hub.update()
+    server.error_rate = 1.0
+
+    await hub.set_water_heater_temperature(1000, 45, 1)
+
+    assert server.requests[HEAT_SETTING] == 1
+    assert server.writes == []
+
+
+async def test_breaker_opens_probes_and_closes(server, hub):
+    """The circuit opens after repeated failures, lets one probe through and closes on success."""
+    hub.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.1)
+    await hub.auth()
+    server.error_rate = 1.0
+    for _ in range(2):
+        with pytest.raises(CSnetConnectionError):
+            await hub.update()
+    assert hub.breaker.state == STATE_OPEN
+
+    # Open: refused without a request
+    sent = server.request_count
+    with pytest.raises(CSnetConnectionError, match="unavailable"):
+        await hub.update()
+    assert server.request_count == sent
+
+    # Half-open: a failed probe opens the circuit again
+    await asyncio.sleep(0.15)
+    assert hub.breaker.allow_request()
+    assert hub.breaker.state == STATE_HALF_OPEN
+    assert not hub.breaker.allow_request()
+    hub.breaker.record_failure()
+    assert hub.breaker.state == STATE_OPEN
+
+    # A successful probe closes it
+    await asyncio.sleep(0.15)
+    server.error_rate = 0.0
+    index = await hub.update()
+    assert len(index) == len(server.elements)
+    assert hub.breaker.state == STATE_CLOSED
+
+
+async def test_probe_cut_short_releases_the_breaker(server, hub):
+    """A probe ending in an unexpected exception lets the next probe through."""
+    hub.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    hub.breaker.record_failure()
+
+    async def broken_request(*args):
+        raise RuntimeError("unexpected")
+
+    hub._authenticated_request = broken_request
+    with pytest.raises(RuntimeError):
+        await hub.update()
+    del hub._authenticated_request
+
+    index = await hub.update()
+    assert len(index) == len(server.elements)
+    assert hub.breaker.state == STATE_CLOSED
+
+
+async def test_malformed_xsrf_token_is_an_auth_error():
+    """A login page mentioning XSRF-TOKEN without a value fails the login cleanly."""
+
+    async def login_page(request):
+        return web.Response(text='<meta name="XSRF-TOKEN">', content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/login", login_page)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "localhost", 0)
+    await site.start()
+    hub = CSnetHub(USERNAME, "secret", base_url=f"http://localhost:{site._server.sockets[0].getsockname()[1]}")
+    try:
+        with pytest.raises(CSnetAuthError, match="XSRF-TOKEN not found"):
+            await hub.auth()
+        assert not hub.credentials_rejected
+    finally:
+        await hub.close()
+        await runner.cleanup()
+
+
+async def test_connection_failure_becomes_update_failed(hass, server, hub):
+    """An unreachable CSNet fails the refresh with UpdateFailed."""
+    coordinator = CSnetCoordinator(hass, hub)
+    server.available = False
+
+    with pytest.raises(UpdateFailed):
+        await coordinator._async_update_data()
+
+
+async def test_rejected_credentials_become_config_entry_auth_failed(hass, server):
+    """A rejected password fails the refresh with ConfigEntryAuthFailed, which starts reauth."""
+    hub = CSnetHub(USERNAME, "wrong", base_url=server.url)
+    coordinator = CSnetCoordinator(hass, hub)
+    try:
+        with pytest.raises(ConfigEntryAuthFailed):
+            await coordinator._async_update_data()
+        assert hub.credentials_rejected
+    finally:
+        await hub.close()
+
+
+async def test_other_auth_errors_become_update_failed(hass, server, hub):
+    """A login fault with accepted credentials keeps polling instead of asking for reauth."""
+    coordinator = CSnetCoordinator(hass, hub)
+
+    async def rejected_session():
+        raise CSnetAuthError("Session rejected by /data/elements right after login")
+
+    hub.update = rejected_session
+
+    with pytest.raises(UpdateFailed):
+        await coordinator._async_update_data()
+    assert not hub.credentials_rejected
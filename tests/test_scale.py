@@ -0,0 +1,108 @@
+"""Tests for installations with many indoor units."""
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.helpers import entity_registry as er
+
+from benchmarks.fake_csnet import build_elements
+from custom_components.csnet import _async_migrate_unique_ids, climate, sensor, water_heater
+from custom_components.csnet.const import DOMAIN
+from custom_components.csnet.coordinator import CSnetCoordinator
+from custom_components.csnet.models import KIND_CLIMATE, KIND_WATER_HEATER, CSnetElement, ElementIndex
+
+UNITS = 48
+
+
+def _index(units):
+    """Return the ElementIndex of `units` indoor units with two air circuits and a tank."""
+    return ElementIndex(CSnetElement.from_dict(element) for element in build_elements(units, 2))
+
+
+def test_index_keeps_every_unit_apart():
+    """Elements of the same type on different units do not replace each other."""
+    index = _index(UNITS)
+
+    assert len(index) == UNITS * 3
+    assert len(index.by_unit) == UNITS
+    assert len(index.of_kind(KIND_CLIMATE)) == UNITS * 2
+    assert len(index.of_kind(KIND_WATER_HEATER)) == UNITS
+    for parent_id in range(1000, 1000 + UNITS):
+        assert index.water_heater(parent_id).key == (parent_id, 3)
+        assert index.get((parent_id, 1)).parent_id == parent_id
+
+
+class _CountedElement(CSnetElement):
+    """Element counting how often its key is read."""
+
+    reads = 0
+
+    @property
+    def key(self):
+        """Return the identity of the element, counting the read."""
+        _CountedElement.reads += 1
+        return super().key
+
+
+def test_index_build_grows_linearly():
+    """Indexing eight times the units does eight times the work, not more."""
+
+    def key_reads(units):
+        _CountedElement.reads = 0
+        index = ElementIndex(_CountedElement.from_dict(element) for element in build_elements(units, 2))
+        assert len(index) == units * 3
+        return _CountedElement.reads
+
+    assert key_reads(8 * UNITS) == 8 * key_reads(UNITS)
+
+
+async def test_entities_have_unique_ids_across_units(hass, server, hub, entry):
+    """Every unit gets its own climate, water heater and sensor entities."""
+    server.elements = build_elements(UNITS, 2)
+    coordinator = CSnetCoordinator(hass, hub)
+    await coordinator.async_refresh()
+    hass.data[DOMAIN] = {entry.entry_id: coordinator}
+
+    entities = []
+    for platform in (climate, water_heater, sensor):
+        await platform.async_setup_entry(hass, entry, entities.extend)
+
+    unique_ids = [entity.unique_id for entity in entities]
+    assert len(unique_ids) == len(set(unique_ids))
+    assert sum(isinstance(entity, climate.Climate) for entity in entities) == UNITS * 2
+    assert sum(isinstance(entity, water_heater.WaterHeater) for entity in entities) == UNITS
+    await coordinator.async_shutdown()
+
+
+async def test_legacy_unique_ids_move_to_the_last_unit(hass, server, hub):
+    """Entities keyed by element type alone belong to the last unit reporting that type."""
+    await er.async_load(hass)
+    registry = er.async_get(hass)
+    entry = ConfigEntry(
+        version=1,
+        minor_version=1,
+        domain=DOMAIN,
+        title="CSNet",
+        data={},
+        source="user",
+        options={},
+        entry_id="entry",
+    )
+    legacy = {
+        "climate": ["hitachi_pumproom1", "hitachi_pumproom2"],
+        "water_heater": ["hitachi_pump_water_room3"],
+        "sensor": ["hitachi_pump_room3_tank_temperature", "hitachi_pump_room1_setpoint"],
+    }
+    for domain, unique_ids in legacy.items():
+        for unique_id in unique_ids:
+            registry.async_get_or_create(domain, DOMAIN, unique_id, config_entry=entry)
+    coordinator = CSnetCoordinator(hass, hub)
+    await coordinator.async_refresh()
+
+    await _async_migrate_unique_ids(hass, entry, coordinator)
+
+    # The stand-in serves units 1000 and 1001
+    assert sorted(entity.unique_id for entity in registry.entities.values()) == [
+        "hitachi_pump_1001_1",
+        "hitachi_pump_1001_1_setpoint",
+        "hitachi_pump_1001_2",
+        "hitachi_pump_1001_3_tank_temperature",
+        "hitachi_pump_water_1001_3",
+    ]
@@ -0,0 +1,106 @@
+"""Tests for the profile and dump_metrics services."""
+import asyncio
+import json
+
+import pytest
+
+from homeassistant.components.persistent_notification import SIGNAL_PERSISTENT_NOTIFICATIONS_UPDATED
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from custom_components.csnet.const import DATA_PROFILER, DOMAIN
+from custom_components.csnet.coordinator import CSnetCoordinator
+from custom_components.csnet.services import (
+    SERVICE_DUMP_METRICS,
+    SERVICE_PROFILE,
+    async_setup_services,
+    async_unload_services,
+)
+
+WATER_HEATER_UNIT = 1000
+
+
+@pytest.fixture
+async def coordinator(hass, hub, entry):
+    """Return a refreshed coordinator registered like a loaded config entry, with the services."""
+    coordinator = CSnetCoordinator(hass, hub)
+    await coordinator.async_refresh()
+    hass.data[DOMAIN] = {entry.entry_id: coordinator}
+    async_setup_services(hass)
+    yield coordinator
+    del hass.data[DOMAIN][entry.entry_id]
+    async_unload_services(hass)
+    await coordinator.async_shutdown()
+
+
+@pytest.fixture
+async def notified(hass):
+    """Return a future resolved with the next persistent notification."""
+    future = asyncio.get_running_loop().create_future()
+
+    def added(update_type, notifications):
+        if not future.done():
+            future.set_result(next(iter(notifications.values())))
+
+    async_dispatcher_connect(hass, SIGNAL_PERSISTENT_NOTIFICATIONS_UPDATED, added)
+    return future
+
+
+def _wrapped(coordinator):
+    """Return the names of the methods the profiler replaced on the instances."""
+    return {"_async_update_data"} & set(vars(coordinator)) | {"_write"} & set(vars(coordinator.hub))
+
+
+async def test_dump_metrics_returns_and_writes_the_counters(hass, coordinator, entry, tmp_path):
+    """The service answers with the counters of every installation and writes them to a file."""
+    response = await hass.services.async_call(DOMAIN, SERVICE_DUMP_METRICS, {}, blocking=True, return_response=True)
+
+    metrics = response[entry.entry_id]
+    assert metrics["connection"] == "connected"
+    assert metrics["queued_commands"] == 0
+    assert metrics["last_update_success"]
+    (path,) = tmp_path.glob("csnet_metrics.*.json")
+    assert json.loads(path.read_text())[entry.entry_id]["connection"] == "connected"
+
+
+async def test_profile_restores_the_methods_when_done(hass, coordinator, notified, tmp_path):
+    """Profiling wraps the refresh and the write, and removes the wrappers after the calls."""
+    await hass.services.async_call(DOMAIN, SERVICE_PROFILE, {"calls": 2}, blocking=True)
+    assert _wrapped(coordinator) == {"_async_update_data", "_write"}
+
+    coordinator.hub.invalidate_elements()
+    await coordinator.async_refresh()
+    await coordinator.hub.set_water_heater_temperature(WATER_HEATER_UNIT, 45, 1)
+
+    notification = await asyncio.wait_for(notified, 5)
+    assert "1 refresh(es) and 1 command(s)" in notification["message"]
+    assert _wrapped(coordinator) == set()
+    assert DATA_PROFILER not in hass.data[DOMAIN]
+    assert len(list(tmp_path.glob("csnet_profile.*.txt"))) == 1
+    assert len(list(tmp_path.glob("csnet_profile.*.prof"))) == 1
+
+
+async def test_profile_restores_the_methods_after_a_failing_call(hass, coordinator, server, notified):
+    """A profiled refresh that raises still counts and leaves the original methods behind."""
+    await hass.services.async_call(DOMAIN, SERVICE_PROFILE, {"calls": 1}, blocking=True)
+    server.available = False
+    coordinator.hub.invalidate_elements()
+
+    with pytest.raises(UpdateFailed):
+        await coordinator._async_update_data()
+
+    await asyncio.wait_for(notified, 5)
+    assert _wrapped(coordinator) == set()
+
+
+async def test_profile_stopped_before_any_call_reports_it(hass, coordinator, notified, tmp_path):
+    """A profile stopped before any call unwraps the methods and writes no files."""
+    await hass.services.async_call(DOMAIN, SERVICE_PROFILE, {"calls": 5}, blocking=True)
+    profiler = hass.data[DOMAIN][DATA_PROFILER]
+
+    profiler.detach()
+
+    notification = await asyncio.wait_for(notified, 5)
+    assert notification["message"] == "No CSNet refresh or command ran while profiling."
+    assert _wrapped(coordinator) == set()
+    assert list(tmp_path.glob("csnet_profile.*")) == []
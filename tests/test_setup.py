@@ -0,0 +1,23 @@
+"""Tests for the config entry setup of the integration."""
+from types import SimpleNamespace
+
+from custom_components.csnet import _options_listener
+
+
+async def test_update_listener_reloads_only_for_changed_options():
+    """Reauth changes the entry data and reloads by itself; only option changes reload here."""
+    reloaded = []
+
+    async def async_reload(entry_id):
+        reloaded.append(entry_id)
+
+    hass = SimpleNamespace(config_entries=SimpleNamespace(async_reload=async_reload))
+    listener = _options_listener({"min_interval": 10})
+
+    entry = SimpleNamespace(entry_id="entry", options={"min_interval": 10}, data={"password": "new"})
+    await listener(hass, entry)
+    assert reloaded == []
+
+    entry.options = {"min_interval": 20}
+    await listener(hass, entry)
+    assert reloaded == ["entry"]
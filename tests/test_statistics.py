@@ -0,0 +1,120 @@
+"""Tests for the hourly statistics mode."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from homeassistant.const import EVENT_HOMEASSISTANT_FINAL_WRITE, EVENT_HOMEASSISTANT_STOP
+from homeassistant.helpers.storage import Store
+
+from custom_components.csnet import statistics as statistics_module
+from custom_components.csnet.statistics import HourlyStatistics
+
+STATISTIC_ID = "csnet:entry_avoutemp"
+HOUR_START = datetime(2024, 3, 1, 10, tzinfo=timezone.utc)
+
+
+def at(minutes):
+    """Return the time `minutes` after HOUR_START."""
+    return HOUR_START + timedelta(minutes=minutes)
+
+
+@pytest.fixture
+def imported(monkeypatch):
+    """Collect the rows handed to the recorder, by statistic id."""
+    rows = {}
+
+    def add_external_statistics(hass, metadata, statistics):
+        rows.setdefault(metadata["statistic_id"], []).extend(statistics)
+
+    monkeypatch.setattr(statistics_module, "async_add_external_statistics", add_external_statistics)
+    return rows
+
+
+async def test_unload_imports_and_saves_the_open_hour(hass, imported):
+    """Stopping mid-hour imports a partial row and the next start continues the hour."""
+    store = Store(hass, 1, "csnet_test.statistics")
+    statistics = HourlyStatistics(hass, store)
+    statistics.observe(STATISTIC_ID, "Outdoor", "°C", 20.0, at(0))
+    statistics.observe(STATISTIC_ID, "Outdoor", "°C", 22.0, at(30))
+
+    await statistics.async_stop(at(45))
+
+    (partial,) = imported[STATISTIC_ID]
+    assert partial["start"] == HOUR_START
+    assert partial["mean"] == pytest.approx((20 * 30 + 22 * 15) / 45)
+    assert (partial["min"], partial["max"]) == (20.0, 22.0)
+
+    restarted = HourlyStatistics(hass, store)
+    await restarted.async_restore(at(50))
+    restarted.observe(STATISTIC_ID, "Outdoor", "°C", 24.0, at(50))
+    restarted.close_hour(at(60))
+    restarted.async_flush()
+
+    # The full hour replaces the partial row; the downtime does not count
+    full = imported[STATISTIC_ID][-1]
+    assert full["start"] == HOUR_START
+    assert full["mean"] == pytest.approx((20 * 30 + 22 * 15 + 24 * 10) / 55)
+    assert (full["min"], full["max"]) == (20.0, 24.0)
+
+
+async def test_restore_after_the_hour_ended_imports_it(hass, imported):
+    """A saved hour that ended while stopped is imported on the next start."""
+    store = Store(hass, 1, "csnet_test.statistics")
+    statistics = HourlyStatistics(hass, store)
+    statistics.observe(STATISTIC_ID, "Outdoor", "°C", 20.0, at(0))
+    await statistics.async_stop(at(20))
+    imported.clear()
+
+    restarted = HourlyStatistics(hass, store)
+    await restarted.async_restore(at(130))
+
+    (row,) = imported[STATISTIC_ID]
+    assert row["start"] == HOUR_START
+    assert row["mean"] == pytest.approx(20.0)
+
+
+async def test_reload_then_restarts_keep_the_completed_hours(hass, imported, monkeypatch):
+    """A restart saves the open hour, and a restored save is not imported twice."""
+    clock = [at(0)]
+    monkeypatch.setattr(statistics_module.dt_util, "utcnow", lambda: clock[0])
+    store = Store(hass, 1, "csnet_test.statistics")
+
+    async def restart(minutes):
+        clock[0] = at(minutes)
+        hass.bus.async_fire(EVENT_HOMEASSISTANT_STOP)
+        hass.bus.async_fire(EVENT_HOMEASSISTANT_FINAL_WRITE)
+        await hass.async_block_till_done()
+        statistics = HourlyStatistics(hass, store)
+        await statistics.async_restore(at(minutes + 5))
+        statistics.async_start()
+        return statistics
+
+    statistics = HourlyStatistics(hass, store)
+    statistics.async_start()
+    statistics.observe(STATISTIC_ID, "Outdoor", "°C", 20.0, at(0))
+
+    # Reload at 10:20
+    await statistics.async_stop(at(20))
+    statistics = HourlyStatistics(hass, store)
+    await statistics.async_restore(at(21))
+    statistics.async_start()
+    statistics.observe(STATISTIC_ID, "Outdoor", "°C", 30.0, at(21))
+    statistics.close_hour(at(60))
+    statistics.async_flush()
+    full = imported[STATISTIC_ID][-1]
+    assert full["mean"] == pytest.approx((20 * 20 + 30 * 39) / 59)
+    statistics.observe(STATISTIC_ID, "Outdoor", "°C", 10.0, at(65))
+
+    # Restart at 11:20, then again at 11:40
+    statistics = await restart(80)
+    statistics.observe(STATISTIC_ID, "Outdoor", "°C", 12.0, at(90))
+    statistics = await restart(100)
+    statistics.close_hour(at(120))
+    statistics.async_flush()
+
+    rows = imported[STATISTIC_ID]
+    assert [row for row in rows if row["start"] == HOUR_START][-1] == full
+    next_hour = rows[-1]
+    assert next_hour["start"] == at(60)
+    # The value carried over from 10:00 counts until the next reading
+    assert next_hour["mean"] == pytest.approx((30 * 5 + 10 * 15 + 12 * 10) / 30)
@@ -0,0 +1,41 @@
+"""Stress test of concurrent commands and polls on one hub."""
+import asyncio
+import random
+
+from custom_components.csnet import hub as hub_module
+from custom_components.csnet.coordinator import CSnetCoordinator
+
+COMMANDS = 300
+POLLS = 100
+
+
+async def test_concurrent_commands_and_polls(hass, server, hub, monkeypatch):
+    """Hundreds of commands and polls share one login and never overlap writes to a unit."""
+    monkeypatch.setattr(hub_module, "COMMAND_DEBOUNCE", 0.02)
+    # Writes outlast the debounce window, so consecutive windows would overlap without the unit lock
+    server.write_latency = 0.05
+    server.latency = 0.002
+    coordinator = CSnetCoordinator(hass, hub)
+    rng = random.Random(0)
+    units = [1000, 1001]
+
+    async def command(step):
+        await asyncio.sleep(rng.uniform(0, 0.5))
+        unit = rng.choice(units)
+        if step % 2:
+            await hub.set_water_heater_temperature(unit, 40 + step % 20, 1)
+        else:
+            await hub.toggle(unit, 1, step % 4 // 2, 20 + step % 5)
+
+    async def poll():
+        await asyncio.sleep(rng.uniform(0, 0.5))
+        hub.invalidate_elements()
+        await coordinator.async_refresh()
+
+    await asyncio.gather(*(command(step) for step in range(COMMANDS)), *(poll() for _ in range(POLLS)))
+
+    assert server.logins == 1
+    assert server.overlapping_writes == 0
+    assert len(server.writes) > len(units)
+    assert coordinator.last_update_success
+    await coordinator.async_shutdown()
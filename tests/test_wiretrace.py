@@ -0,0 +1,50 @@
+"""Tests for the redaction of the wire trace."""
+import asyncio
+import gzip
+
+import pytest
+
+from custom_components.csnet.wiretrace import WireRecorder, read_trace, redact_body, redact_form
+
+
+@pytest.mark.parametrize(
+    ("body", "expected"),
+    [
+        (b'{"password": "secret", "temp": "20"}', b'{"password": "***", "temp": "20"}'),
+        (b'<input type="hidden" name="_csrf" value="abc123"/>', b'<input type="hidden" name="_csrf" value="***"/>'),
+        (b"<input value='abc123' name='_csrf'>", b"<input value='***' name='_csrf'>"),
+        (b'<meta name="_csrf" content="abc123"/>', b'<meta name="_csrf" content="***"/>'),
+        (b'document.cookie = "XSRF-TOKEN=abc123; path=/"', b'document.cookie = "XSRF-TOKEN=***; path=/"'),
+        (b'<input name="zone" value="1">', b'<input name="zone" value="1">'),
+    ],
+)
+def test_redact_body(body, expected):
+    """Credential-like JSON values and tokens in HTML are masked; other values are kept."""
+    assert redact_body(body) == expected
+
+
+def test_redact_form():
+    """Credential form fields are masked."""
+    assert redact_form("username=a&password=b&_csrf=c&indoorId=1000") == (
+        "username=***&password=***&_csrf=***&indoorId=1000"
+    )
+
+
+async def test_trace_holds_no_tokens(tmp_path, server, hub):
+    """The login page is recorded without its body and no token reaches the trace."""
+    path = tmp_path / "trace.jsonl.gz"
+    hub.recorder = WireRecorder(str(path))
+    await hub.update()
+    await hub.set_water_heater_temperature(1000, 45, 1)
+    await asyncio.wrap_future(hub.recorder.flush())
+    hub.recorder.close()
+
+    exchanges = list(read_trace(path))
+    login_page = next(exchange for exchange in exchanges if exchange["method"] == "GET" and exchange["path"] == "/login")
+    assert login_page["response"] == ""
+    with gzip.open(path) as file:
+        trace = file.read()
+    cookies = hub.session.cookie_jar.filter_cookies(hub.base_url)
+    for name in ("XSRF-TOKEN", "SESSION"):
+        assert cookies[name].value.encode() not in trace
+    assert all("_csrf=***" in exchange["request"] for exchange in exchanges if exchange["request"])